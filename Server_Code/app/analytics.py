@@ -0,0 +1,316 @@
+"""
+Packet history statistics computed on NumPy arrays.
+
+PacketColumns gathers device, seq, RSSI and timestamp for every stored
+packet in bulk: archived days straight from their memory-mapped arrays,
+live partitions through a cache. summarize() then works out per-device
+figures with array operations instead of a Python loop per row:
+
+- delivery ratio: distinct seqs received against the seq span they cover
+- loss bursts: lengths of the runs of consecutive missing seqs
+- RSSI percentiles, and a histogram on bins shared by every device
+- inter-arrival times between a device's packets
+"""
+import threading
+
+import numpy as np
+
+import archive
+import partitions
+from device_state import DEFAULT_WINDOW_SIZE, jumped_back
+
+RSSI_PERCENTILES = (5, 25, 50, 75, 95)
+INTERVAL_PERCENTILES = (50, 90, 99)
+# Histogram bins are given by their lower edges; the last one is open-ended
+INTERVAL_EDGES = (0, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 3600)
+BURST_EDGES = (1, 2, 3, 4, 5, 10, 100)
+# Inter-arrival times below this many milliseconds are counted per millisecond
+INTERVAL_COUNT_MS = 65536
+# Rows scanned at once when looking for the next transmitter reset
+RESET_SCAN_ROWS = 65536
+# Columns kept for live partitions; packet_loss isn't used here
+LIVE_COLUMNS = ('id', 'device', 'seq', 'rssi', 'timestamp')
+
+
+def _histogram(values, edges):
+    bins = np.searchsorted(edges, values, side='right') - 1
+    counts = np.bincount(bins[bins >= 0], minlength=len(edges))
+    return {'edges': list(edges), 'counts': counts.tolist()}
+
+
+def _ranked(cumulative, overflow, ranks):
+    # Values at 0-based ranks, from cumulative counts of small integers plus the sorted values beyond them
+    total = int(cumulative[-1])
+    values = np.searchsorted(cumulative, np.minimum(ranks, total - 1), side='right')
+    if len(overflow):
+        values = np.where(ranks < total, values, overflow[np.clip(ranks - total, 0, len(overflow) - 1)])
+    return values
+
+
+def _percentiles(cumulative, overflow, count, percentiles):
+    """np.percentile's default (linear) interpolation, read off counts instead of partitioning the values"""
+    positions = np.array(percentiles) / 100 * (count - 1)
+    lower = np.floor(positions).astype(np.int64)
+    low_values = _ranked(cumulative, overflow, lower)
+    high_values = _ranked(cumulative, overflow, np.minimum(lower + 1, count - 1))
+    return low_values + (high_values - low_values) * (positions - lower)
+
+
+class PacketColumns:
+    """
+    Bulk column loads for analytics.
+
+    Closed live partitions never change, so each is read from SQLite once and
+    kept as arrays; data_current is topped up with the rows added since the
+    previous load. A clear or an expiry (the clear generation moving) starts
+    the cache over.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._live = {}
+
+    def _refresh(self, conn, names):
+        generation = conn.execute("SELECT value FROM meta WHERE key = 'clear_generation'").fetchone()[0]
+        if generation != self._generation:
+            self._generation = generation
+            self._live = {}
+        current_day = partitions.current_day(conn)
+        for name in set(self._live) - set(names):
+            del self._live[name]
+
+        for name in names:
+            cached = self._live.get(name)
+            if name == partitions.CURRENT and cached is not None and cached['day'] != current_day:
+                # Rolled over: those rows are a closed partition now
+                cached = None
+            if cached is not None and name != partitions.CURRENT:
+                continue
+            after_id = int(cached['arrays']['id'][-1]) if cached and len(cached['arrays']['id']) else 0
+            arrays, devices = archive.partition_arrays(conn, name, after_id)
+            arrays = {column: arrays[column] for column in LIVE_COLUMNS}
+            if cached is not None and len(arrays['id']):
+                # New rows code devices against their own dictionary; recode them into the cached one
+                codes = {device_id: code for code, device_id in enumerate(cached['devices'])}
+                lookup = np.array([codes.setdefault(device_id, len(codes)) for device_id in devices], dtype=np.int64)
+                arrays['device'] = lookup[arrays['device']]
+                arrays = {column: np.concatenate((cached['arrays'][column], arrays[column])) for column in LIVE_COLUMNS}
+                # Small codes keep the grouping sort in load() a radix sort
+                arrays['device'] = arrays['device'].astype(np.min_scalar_type(max(len(codes) - 1, 0)))
+                cached = {'day': cached['day'], 'arrays': arrays, 'devices': list(codes)}
+            elif cached is None:
+                cached = {'day': current_day, 'arrays': arrays, 'devices': devices}
+            self._live[name] = cached
+        return [self._live[name] for name in names]
+
+    def load(self, conn, column_archive, device_id=None, since=None, until=None):
+        """
+        seq, rssi and timestamp arrays of the matching packets, grouped by device: the rows of
+        devices[code] are [ends[code - 1]:ends[code]], in id order. since/until are ISO times,
+        since inclusive; rssi and timestamp use the archive's missing markers.
+        """
+        since_micros = int(archive.to_micros([since])[0]) if since else None
+        until_micros = int(archive.to_micros([until])[0]) if until else None
+        names = partitions.snapshot(conn)
+        with self._lock:
+            live = self._refresh(conn, names)
+        sources = [(segment, segment.devices, segment.meta) for segment in column_archive.segments(exclude=names)]
+        sources += [(cached['arrays'], cached['devices'], None) for cached in live]
+
+        device_codes = {}
+        # (device code, source number, column arrays) for every device's rows in every source
+        pieces = []
+        for number, (columns, devices, meta) in enumerate(sources):
+            if meta is not None:
+                if since_micros is not None and (meta['max_time'] is None or meta['max_time'] < since_micros):
+                    continue
+                if until_micros is not None and (meta['min_time'] is None or meta['min_time'] >= until_micros):
+                    continue
+            mask = None
+            if device_id is not None:
+                if device_id not in devices:
+                    continue
+                mask = columns['device'] == devices.index(device_id)
+            timestamps = columns['timestamp']
+            if since_micros is not None:
+                mask = (timestamps >= since_micros) if mask is None else mask & (timestamps >= since_micros)
+            if until_micros is not None:
+                # A missing time never matches a time filter, as with NULL in SQL
+                in_range = (timestamps < until_micros) & (timestamps != archive.TIME_MISSING)
+                mask = in_range if mask is None else mask & in_range
+            values = {column: columns[column] if mask is None else columns[column][mask]
+                      for column in ('device', 'seq', 'rssi', 'timestamp')}
+            # Grouped one source at a time: sorting and gathering a day's rows stays in cache,
+            # which is several times faster than one pass over the whole history
+            order = np.argsort(values['device'], kind='stable')
+            grouped = {column: values[column][order] for column in ('seq', 'rssi', 'timestamp')}
+            start = 0
+            for code, count in enumerate(np.bincount(values['device'], minlength=len(devices)).tolist()):
+                if count:
+                    pieces.append((device_codes.setdefault(devices[code], len(device_codes)), number,
+                                   {column: array[start:start + count] for column, array in grouped.items()}))
+                    start += count
+
+        # Device by device, each in source (and so id) order
+        pieces.sort(key=lambda piece: piece[:2])
+        dtypes = {'seq': np.int64, 'rssi': np.int16, 'timestamp': np.int64}
+        result = {column: np.concatenate([piece[2][column] for piece in pieces]) if pieces
+                  else np.empty(0, dtype=dtype) for column, dtype in dtypes.items()}
+        counts = np.zeros(len(device_codes), dtype=np.int64)
+        for code, _, arrays in pieces:
+            counts[code] += len(arrays['seq'])
+        result['ends'] = np.cumsum(counts).tolist()
+        result['devices'] = list(device_codes)
+        return result
+
+
+def reset_points(seqs, window_size=DEFAULT_WINDOW_SIZE):
+    """
+    Positions in seqs (arrival order) where a transmitter reset starts a new epoch, by SeqWindow's
+    rules measured against the newest seq of the epoch so far; any seq 1 behind it counts as one.
+    """
+    points = []
+    highest = int(seqs[0]) if len(seqs) else 0
+    start = 1
+    while start < len(seqs):
+        block = seqs[start:start + RESET_SCAN_ROWS]
+        # Exact up to the first reset in the block
+        before = np.maximum.accumulate(np.concatenate(([highest], block[:-1])))
+        offsets = before - block
+        found = np.flatnonzero(jumped_back(block, offsets, window_size) | ((block == 1) & (offsets > 0)))
+        if len(found):
+            start += int(found[0])
+            points.append(start)
+            highest = int(seqs[start])
+            start += 1
+        else:
+            highest = max(highest, int(block.max()))
+            start += len(block)
+    return np.array(points, dtype=np.int64)
+
+
+def delivery(seqs, window_size=DEFAULT_WINDOW_SIZE):
+    """
+    Delivery figures for one device's seqs in arrival order; each transmitter reset
+    (see reset_points) starts a new epoch.
+    """
+    if len(seqs) == 0:
+        return {'received': 0, 'lost': 0, 'duplicates': 0, 'resets': 0, 'delivery_ratio': None,
+                'loss_bursts': {'count': 0, 'max': 0, 'mean': 0, 'histogram': _histogram([], BURST_EDGES)}}
+    previous, current = seqs[:-1], seqs[1:]
+    reset_at = reset_points(seqs, window_size)
+    low = int(seqs.min())
+    span = int(seqs.max()) - low + 1
+
+    if len(reset_at) == 0:
+        # The usual case: one epoch, so the seqs themselves are the keys
+        keys = seqs if np.all(current >= previous) else np.sort(seqs, kind='stable')
+        distinct = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        steps = np.diff(distinct)
+        same_epoch = True
+    else:
+        epochs = np.repeat(np.arange(len(reset_at) + 1), np.diff(np.concatenate(([0], reset_at, [len(seqs)]))))
+        if (len(reset_at) + 1) * span < 2 ** 62:
+            # Epochs are contiguous in arrival order, so (epoch, seq) packs into one key that keeps them
+            # apart. Arrivals are nearly in order already, which the stable sort (timsort) handles in ~linear time.
+            keys = np.sort(epochs * span + (seqs - low), kind='stable')
+            distinct = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+            steps = np.diff(distinct)
+            same_epoch = distinct[1:] // span == distinct[:-1] // span
+        else:
+            order = np.lexsort((seqs, epochs))
+            sorted_epochs, sorted_seqs = epochs[order], seqs[order]
+            first = np.concatenate(([True], (sorted_epochs[1:] != sorted_epochs[:-1]) | (sorted_seqs[1:] != sorted_seqs[:-1])))
+            distinct, distinct_epochs = sorted_seqs[first], sorted_epochs[first]
+            steps = np.diff(distinct)
+            same_epoch = distinct_epochs[1:] == distinct_epochs[:-1]
+
+    bursts = (steps - 1)[same_epoch & (steps > 1)]
+    received = len(distinct)
+    lost = int(bursts.sum())
+    return {
+        'received': received,
+        'lost': lost,
+        'duplicates': len(seqs) - received,
+        'resets': len(reset_at),
+        'delivery_ratio': round(received / (received + lost), 4),
+        'loss_bursts': {
+            'count': len(bursts),
+            'max': int(bursts.max()) if len(bursts) else 0,
+            'mean': round(float(bursts.mean()), 2) if len(bursts) else 0,
+            'histogram': _histogram(bursts, BURST_EDGES)
+        }
+    }
+
+
+def rssi_stats(rssi, low, rssi_bin):
+    """RSSI figures for one device; low is the first histogram edge, a multiple of rssi_bin"""
+    readings = rssi[rssi != archive.RSSI_MISSING]
+    if len(readings) == 0:
+        return {'count': 0}
+    # Readings are small integers, so one count per dB gives exact percentiles without sorting
+    counts = np.bincount(readings.astype(np.int64) - low)
+    cumulative = np.cumsum(counts)
+    count = int(cumulative[-1])
+    percentiles = _percentiles(cumulative, (), count, RSSI_PERCENTILES) + low
+    bins = np.add.reduceat(counts, np.arange(0, len(counts), rssi_bin))
+    return {
+        'count': count,
+        'min': int(_ranked(cumulative, (), 0)) + low,
+        'max': len(counts) - 1 + low,
+        'mean': round(float(np.dot(counts, np.arange(len(counts)))) / count + low, 2),
+        'percentiles': {f'p{percentile}': round(float(value), 1) for percentile, value in zip(RSSI_PERCENTILES, percentiles)},
+        'histogram': {'edges': list(range(low, low + len(bins) * rssi_bin, rssi_bin)), 'counts': bins.tolist()}
+    }
+
+
+def interarrival_stats(timestamps):
+    """Seconds between consecutive packets, percentiles to the millisecond; a clock step backwards counts as 0"""
+    if (timestamps == archive.TIME_MISSING).any():
+        timestamps = timestamps[timestamps != archive.TIME_MISSING]
+    if len(timestamps) < 2:
+        return {'count': 0}
+    intervals = np.diff(timestamps)
+    np.maximum(intervals, 0, out=intervals)
+    intervals //= 1000
+    # Millisecond counts up to INTERVAL_COUNT_MS; the few longer gaps are sorted separately
+    counts = np.bincount(np.minimum(intervals, INTERVAL_COUNT_MS), minlength=INTERVAL_COUNT_MS + 1)[:INTERVAL_COUNT_MS]
+    cumulative = np.cumsum(counts)
+    overflow = np.sort(intervals[intervals >= INTERVAL_COUNT_MS])
+    count = len(intervals)
+    percentiles = _percentiles(cumulative, overflow, count, INTERVAL_PERCENTILES) / 1000
+    # Sum and max from the counts rather than another pass over every interval
+    total_ms = int(np.dot(counts, np.arange(INTERVAL_COUNT_MS))) + int(overflow.sum())
+    max_ms = int(overflow[-1]) if len(overflow) else int(np.flatnonzero(counts)[-1])
+    # Packets below each edge, then the differences between neighbouring edges
+    below = np.array([cumulative[edge_ms - 1] if 0 < edge_ms <= INTERVAL_COUNT_MS
+                      else 0 if edge_ms == 0 else cumulative[-1] + np.searchsorted(overflow, edge_ms)
+                      for edge_ms in (round(edge * 1000) for edge in INTERVAL_EDGES)])
+    return {
+        'count': count,
+        'mean': round(total_ms / count / 1000, 3),
+        'max': round(max_ms / 1000, 3),
+        'percentiles': {f'p{percentile}': round(float(value), 3) for percentile, value in zip(INTERVAL_PERCENTILES, percentiles)},
+        'histogram': {'edges': list(INTERVAL_EDGES), 'counts': np.diff(np.append(below, count)).tolist()}
+    }
+
+
+def summarize(columns, rssi_bin=5, window_size=DEFAULT_WINDOW_SIZE):
+    """Per-device statistics over arrays from PacketColumns.load()"""
+    seqs, rssi, timestamps = columns['seq'], columns['rssi'], columns['timestamp']
+    # RSSI bins start at the same edge for every device, so they line up bin for bin
+    readings = rssi != archive.RSSI_MISSING
+    low = int(rssi.min(where=readings, initial=np.iinfo(np.int16).max)) // rssi_bin * rssi_bin if readings.any() else 0
+
+    result = {}
+    start = 0
+    for device_id, end in zip(columns['devices'], columns['ends']):
+        result[device_id] = {
+            'packets': end - start,
+            **delivery(seqs[start:end], window_size),
+            'rssi': rssi_stats(rssi[start:end], low, rssi_bin),
+            'interarrival': interarrival_stats(timestamps[start:end])
+        }
+        start = end
+    return {'rows': len(seqs), 'devices': dict(sorted(result.items()))}
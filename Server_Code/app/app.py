@@ -1,22 +1,50 @@
-from flask import Flask, request, render_template_string, jsonify
+from flask import Flask, Response, request, render_template, jsonify
 from flask_socketio import SocketIO, emit
 import sqlite3
 import json
-from datetime import datetime
+import csv
+import functools
+import heapq
+import io
+import zlib
+from datetime import datetime, timedelta
 import time
 import os
-
-app = Flask(__name__)
+import atexit
+import queue
+import signal
+import sys
+
+import db
+import migrations
+import partitions
+import rollups
+import analytics
+from archive import ColumnArchive
+from broadcast import BroadcastCoalescer
+from subscriptions import SubscriptionRegistry
+from device_state import DeviceStateCache, SharedDeviceState
+from ingest import WriteBehindWriter
+from negotiation import compress, etag_matches
+from packet_format import BINARY_MIMETYPE, decode_packets
+from retention import RetentionTask
+from static_assets import StaticAssets
+
+# Dashboard CSS/JS are served from memory by the /static route below, not Flask's default handler
+app = Flask(__name__, static_folder=None)
 app.config['SECRET_KEY'] = 'secret!'
-socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True)
 
-# Add custom template filter for JSON parsing
-@app.template_filter('from_json')
-def from_json_filter(value):
-    try:
-        return json.loads(value) if value else {}
-    except (json.JSONDecodeError, TypeError):
-        return {}
+# 'dev' runs the Werkzeug server with the debugger and reloader (python app.py);
+# 'production' is served by gunicorn (gunicorn -c gunicorn.conf.py app:app)
+SERVER_PROFILE = os.environ.get('IOT_SERVER_PROFILE', 'dev')
+# Per-packet prints and engine.io frame logging; too slow and noisy for production
+VERBOSE_LOGGING = os.environ.get('IOT_VERBOSE_LOGGING', '1' if SERVER_PROFILE == 'dev' else '0') == '1'
+# With several gunicorn workers, a message queue (e.g. redis://) lets every worker
+# broadcast to dashboards connected to the others
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('IOT_SOCKETIO_MESSAGE_QUEUE') or None
+
+socketio = SocketIO(app, cors_allowed_origins="*", logger=VERBOSE_LOGGING, engineio_logger=VERBOSE_LOGGING,
+                    message_queue=SOCKETIO_MESSAGE_QUEUE)
 
 # SQLite DB setup
 DEFAULT_DB_FILENAME = os.environ.get('IOT_DB_FILENAME', 'device_data.db')
@@ -29,1544 +57,890 @@ os.makedirs(DEFAULT_DB_DIRECTORY, exist_ok=True)
 DATABASE_NAME = DEFAULT_DB_FILENAME
 DATABASE_PATH = os.path.join(DEFAULT_DB_DIRECTORY, DATABASE_NAME)
 
-# Track last sequence number per device for packet loss calculation
-last_seq = {}
+# 'memory' keeps device state in this process (single worker); 'shared' keeps it in
+# the loss table so several gunicorn workers account loss correctly
+DEVICE_STATE_MODE = os.environ.get(
+    'IOT_DEVICE_STATE',
+    'shared' if int(os.environ.get('WEB_CONCURRENCY', 1)) > 1 else 'memory'
+)
+# Device state changes are written back to the loss table at most this often
+STATE_PERSIST_INTERVAL_MS = int(os.environ.get('IOT_STATE_PERSIST_INTERVAL_MS', 1000))
+# How far behind the newest seq a packet may arrive and still count as reordered rather than a reset
+SEQ_WINDOW_SIZE = int(os.environ.get('IOT_SEQ_WINDOW_SIZE', 256))
+
+# Optional write-behind ingest: packets are acknowledged once queued and a
+# background writer group-commits them at most MAX_DELAY_MS later. Shared device
+# state writes the loss table inside the request's transaction, which has to commit
+# together with the rows, so write-behind only applies to the in-memory mode.
+WRITE_BEHIND_ENABLED = os.environ.get('IOT_WRITE_BEHIND', '0') == '1' and DEVICE_STATE_MODE != 'shared'
+WRITE_BEHIND_MAX_DELAY_MS = int(os.environ.get('IOT_WRITE_BEHIND_MAX_DELAY_MS', 50))
+# Both counted in packets; a request is queued whole or refused with 503
+WRITE_BEHIND_MAX_BATCH_PACKETS = int(os.environ.get('IOT_WRITE_BEHIND_MAX_BATCH_PACKETS', 500))
+WRITE_BEHIND_QUEUE_SIZE = int(os.environ.get('IOT_WRITE_BEHIND_QUEUE_SIZE', 10000))
+
+# Dashboard updates are coalesced into one new_data_batch event per tick; 0 emits every packet
+BROADCAST_TICK_MS = int(os.environ.get('IOT_BROADCAST_TICK_MS', 150))
+BROADCAST_MAX_BATCH = int(os.environ.get('IOT_BROADCAST_MAX_BATCH', 1000))
+
+# /data/all returns this many rows per page unless ?limit= asks for more, up to the max
+DATA_PAGE_ROWS = int(os.environ.get('IOT_DATA_PAGE_ROWS', 500))
+DATA_PAGE_MAX_ROWS = int(os.environ.get('IOT_DATA_PAGE_MAX_ROWS', 5000))
+
+# /data/export reads the table this many rows per query, so memory stays flat for any table size
+EXPORT_CHUNK_ROWS = int(os.environ.get('IOT_EXPORT_CHUNK_ROWS', 5000))
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_COLUMNS = ('id', 'device_id', 'seq', 'packet_loss', 'rssi', 'timestamp')
+
+# /data/query returns at most this many rows; ?limit= can lower it
+QUERY_MAX_ROWS = int(os.environ.get('IOT_QUERY_MAX_ROWS', 10000))
+QUERY_COLUMNS = ('id', 'device_id', 'seq', 'packet_loss', 'rssi', 'timestamp')
+
+# Rows live in per-day partitions; whole days older than this are dropped. Opt-in: 0 (the default) keeps everything
+RETENTION_DAYS = int(os.environ.get('IOT_RETENTION_DAYS', 0))
+# How often the retention task looks for expired days; it also wakes just after midnight to roll over
+RETENTION_INTERVAL_S = int(os.environ.get('IOT_RETENTION_INTERVAL_S', 300))
+# Free pages returned to the filesystem per retention pass (0 means all of them)
+VACUUM_PAGES = int(os.environ.get('IOT_VACUUM_PAGES', 0))
+# Days older than this move out of SQLite into per-column NumPy files. Opt-in: 0 (the default) keeps them in the database
+ARCHIVE_AFTER_DAYS = int(os.environ.get('IOT_ARCHIVE_AFTER_DAYS', 0))
+# Defaults to a directory next to the database file
+ARCHIVE_DIRECTORY = os.environ.get('IOT_ARCHIVE_DIRECTORY')
+
+# Width in dB of the /analytics RSSI histogram bins
+ANALYTICS_RSSI_BIN = int(os.environ.get('IOT_ANALYTICS_RSSI_BIN', 5))
+
+# New rows always go to the open partition; see partitions.py
+INSERT_DATA_SQL = (f"INSERT INTO {partitions.CURRENT} (device_id, data, seq, packet_loss, rssi, timestamp) "
+                   "VALUES (?, ?, ?, ?, ?, ?)")
+# Receivers that see a transmitter reset within this many seconds of the first one share its epoch
+EPOCH_JOIN_SECONDS = int(os.environ.get('IOT_EPOCH_JOIN_SECONDS', 60))
+# Maps a receiver's reset count to the transmitter epoch every receiver shares. A receiver heard
+# for the first time joins the latest epoch; one that sees a reset joins the epoch another receiver
+# started within EPOCH_JOIN_SECONDS, or starts the next one. Params: device, resets, now, cutoff.
+MAP_EPOCH_SQL = """INSERT OR IGNORE INTO reception_epochs (device_id, resets, epoch, started_at)
+                   SELECT ?1, ?2, CASE
+                       WHEN latest.epoch IS NULL THEN 0
+                       WHEN own.epoch IS NULL THEN latest.epoch
+                       WHEN latest.epoch > own.epoch AND latest.started_at >= ?4 THEN latest.epoch
+                       ELSE latest.epoch + 1 END, ?3
+                   FROM (SELECT epoch, MIN(started_at) AS started_at FROM reception_epochs
+                         WHERE epoch = (SELECT MAX(epoch) FROM reception_epochs)) AS latest,
+                        (SELECT MAX(epoch) AS epoch FROM reception_epochs WHERE device_id = ?1) AS own"""
+# First receipt of a transmitter seq by each receiver, per transmitter epoch, so seqs that
+# come round again after a reset are stored instead of ignored
+INSERT_RECEPTION_SQL = ("INSERT OR IGNORE INTO receptions (seq, epoch, device_id, rssi, received_at) "
+                        "SELECT ?, epoch, device_id, ?, ? FROM reception_epochs WHERE device_id = ? AND resets = ?")
+# Latest reading and running packet count per device, one upsert per ingest request
+UPSERT_SUMMARY_SQL = """INSERT INTO device_summary (device_id, last_seq, last_rssi, packet_loss, packets, last_seen)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(device_id) DO UPDATE SET
+                            last_seq = excluded.last_seq,
+                            last_rssi = excluded.last_rssi,
+                            packet_loss = excluded.packet_loss,
+                            packets = packets + excluded.packets,
+                            last_seen = excluded.last_seen"""
+# Receiver cards show a device as active when it was heard from this recently
+DEVICE_ACTIVE_SECONDS = int(os.environ.get('IOT_DEVICE_ACTIVE_SECONDS', 60))
+# JSON reads at least this large are gzip/brotli compressed for clients that accept it
+COMPRESS_MIN_BYTES = int(os.environ.get('IOT_COMPRESS_MIN_BYTES', 1024))
+# Dashboard CSS/JS, precompressed once at startup
+static_assets = StaticAssets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+
+# Sliding sequence window and loss/duplicate/reorder counters per device
+if DEVICE_STATE_MODE == 'shared':
+    device_states = SharedDeviceState(window_size=SEQ_WINDOW_SIZE)
+else:
+    device_states = DeviceStateCache(persist_interval_ms=STATE_PERSIST_INTERVAL_MS, window_size=SEQ_WINDOW_SIZE)
+writer = None
+column_archive = ColumnArchive()
+packet_columns = analytics.PacketColumns()
+retention = RetentionTask(retention_days=RETENTION_DAYS, interval_s=RETENTION_INTERVAL_S, vacuum_pages=VACUUM_PAGES,
+                          column_archive=column_archive, archive_after_days=ARCHIVE_AFTER_DAYS)
+subscriptions = SubscriptionRegistry(socketio.server, distributed=SOCKETIO_MESSAGE_QUEUE is not None)
+coalescer = BroadcastCoalescer(socketio, tick_ms=BROADCAST_TICK_MS, max_batch=BROADCAST_MAX_BATCH,
+                               route=subscriptions.route)
 
 def init_db():
-    with sqlite3.connect(DATABASE_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''CREATE TABLE IF NOT EXISTS data (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            device_id TEXT NOT NULL,
-                            seq INTEGER NOT NULL,
-                            packet_loss INTEGER DEFAULT 0,
-                            data TEXT NOT NULL,
-                            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-        cursor.execute('''CREATE TABLE IF NOT EXISTS loss(
-                       recieverid TEXT PRIMARY KEY,
-                       diffpacket REAL DEFAULT 0)
-                       ''')
-        # Check if timestamp column exists and add it if it doesn't (for existing databases)
-        cursor.execute("PRAGMA table_info(data)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'timestamp' not in columns:
-            # SQLite doesn't allow non-constant defaults in ALTER TABLE, so we add without default
-            cursor.execute('ALTER TABLE data ADD COLUMN timestamp DATETIME')
-            # Update existing rows with current timestamp
-            current_time = datetime.now().isoformat()
-            cursor.execute('UPDATE data SET timestamp = ? WHERE timestamp IS NULL', (current_time,))
-        
-        conn.commit()
+    # A fresh connection (not a pooled one) so the journal mode is applied to a new file.
+    # Only migrations newer than the file's schema version run, so this is cheap after the first start.
+    conn = db.connect(DATABASE_PATH)
+    try:
+        # Incremental auto-vacuum lets retention give dropped partitions back to the disk.
+        # db.connect sets it on new files; ones created before that need a one-off VACUUM.
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            print("Converting the database to incremental auto-vacuum (one-off VACUUM)")
+            try:
+                conn.execute('VACUUM')
+            except sqlite3.OperationalError as exc:
+                # Busy with another worker; the next start tries again
+                print(f"VACUUM skipped: {exc}")
+        applied = migrations.migrate(conn)
+    finally:
+        conn.close()
+    if applied:
+        print(f"Applied database migrations: {', '.join(applied)}")
+
+    # Rebuild the in-memory sequence/loss state so the first packet after a restart is counted correctly
+    device_states.load(DATABASE_PATH)
+    retention.database_path = DATABASE_PATH
+    column_archive.directory = ARCHIVE_DIRECTORY or os.path.splitext(DATABASE_PATH)[0] + '_archive'
 
 
 # Ensure database exists as soon as the module is imported
 init_db()
 
+
+def get_writer():
+    global writer
+    if writer is None or writer.database_path != DATABASE_PATH:
+        if writer is not None:
+            writer.stop()
+        writer = WriteBehindWriter(
+            DATABASE_PATH,
+            max_delay_ms=WRITE_BEHIND_MAX_DELAY_MS,
+            max_batch_packets=WRITE_BEHIND_MAX_BATCH_PACKETS,
+            max_queue=WRITE_BEHIND_QUEUE_SIZE
+        )
+    return writer
+
+
+def stop_writer():
+    # Commit whatever is still queued before the process exits
+    if writer is not None:
+        writer.stop()
+    device_states.stop()
+    retention.stop()
+
+
+atexit.register(stop_writer)
+
+
+def disconnect_clients():
+    # Open websockets each hold a worker thread; dropping them lets a stopping worker
+    # finish its in-flight requests and exit instead of waiting out the graceful timeout.
+    # Dashboards reconnect on their own.
+    socketio.server.eio.disconnect()
+
+
+def ingest_has_room(packets=1):
+    return not WRITE_BEHIND_ENABLED or get_writer().has_room(packets)
+
+
+def broadcast(updates):
+    if BROADCAST_TICK_MS > 0:
+        coalescer.publish(updates)
+        return
+    # Only rooms with a subscriber for these devices get the event
+    for room, room_updates in subscriptions.route(updates):
+        if len(room_updates) == 1:
+            socketio.emit('new_data', room_updates[0], to=room)
+        else:
+            socketio.emit('new_data_batch', {'updates': room_updates}, to=room)
+
+
+def packet_rssi(record):
+    try:
+        return int(record.get('rssi'))
+    except (TypeError, ValueError):
+        return None
+
+
+def store_packets(cursor, device_id, packets, timestamp):
+    # packets is a list of (record, seq, packet_loss, lost_change, received_change, resets) in arrival order
+    rows = [(device_id, json.dumps(record), seq, packet_loss, packet_rssi(record), timestamp)
+            for record, seq, packet_loss, _, _, _ in packets]
+    cutoff = (datetime.fromisoformat(timestamp) - timedelta(seconds=EPOCH_JOIN_SECONDS)).isoformat()
+    epochs = [(device_id, resets, timestamp, cutoff) for resets in dict.fromkeys(packet[5] for packet in packets)]
+    receptions = [(seq, row[4], timestamp, device_id, resets)
+                  for row, (_, seq, _, _, _, resets) in zip(rows, packets)]
+    # The minute/hour/day aggregates and the device summary are updated alongside the rows
+    summary_rows = [(UPSERT_SUMMARY_SQL, (device_id, rows[-1][2], rows[-1][4], rows[-1][3], len(rows), timestamp))]
+    summary_rows += rollups.rollup_statements(
+        device_id, timestamp,
+        [(row[4], received_change, lost_change) for row, (_, _, _, lost_change, received_change, _) in zip(rows, packets)])
+    # Started with the first packet, and again in a forked worker
+    retention.start()
+    statements = [(INSERT_DATA_SQL, rows), (MAP_EPOCH_SQL, epochs), (INSERT_RECEPTION_SQL, receptions)]
+    statements += [(sql, [summary_row]) for sql, summary_row in summary_rows]
+    if WRITE_BEHIND_ENABLED:
+        # One queue item per request, so it is committed whole or not at all
+        get_writer().submit(statements, len(rows))
+    else:
+        for sql, params in statements:
+            cursor.executemany(sql, params)
+
+
+def batch_seqs(records):
+    # Returns (seqs, None) for a valid batch upload, or (None, (message, status))
+    if not isinstance(records, list) or not records:
+        return None, ("Expected a non-empty JSON array of packets", 400)
+
+    for record in records:
+        if not isinstance(record, dict) or record.get("message") != "skywalker":
+            return None, ("Wrong Transmitter", 403)
+
+    try:
+        return [int(record['seq']) for record in records], None
+    except (KeyError, TypeError, ValueError):
+        return None, ("Every packet needs an integer seq", 400)
+
+
+def ingest_packets(device_id, records, seqs):
+    """
+    Account for packets in arrival order and write them in a single transaction.
+    Returns the dashboard updates; raises queue.Full when the write-behind queue is full.
+    """
+    current_timestamp = datetime.now().isoformat()
+    packets = []
+    updates = []
+    with db.connection(DATABASE_PATH) as conn:
+        for record, current_seq in zip(records, seqs):
+            c_packetloss, lost_change, received_change, resets = device_states.record(device_id, current_seq, conn)
+            packets.append((record, current_seq, c_packetloss, lost_change, received_change, resets))
+            updates.append({
+                'device_id': device_id,
+                'data': record,
+                'seq': current_seq,
+                'packet_loss': c_packetloss
+            })
+        store_packets(conn.cursor(), device_id, packets, current_timestamp)
+    return updates
+
 @socketio.on('connect')
 def handle_connect():
-    print('Client connected')
+    if VERBOSE_LOGGING:
+        print('Client connected')
+    # Every device until the client narrows it down
+    subscriptions.connect(request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    print('Client disconnected')
+    if VERBOSE_LOGGING:
+        print('Client disconnected')
+    subscriptions.disconnect(request.sid)
+
+@socketio.on('subscribe')
+def handle_subscribe(message):
+    # {devices: [...], patterns: [...]}; both empty subscribes to every device
+    message = message if isinstance(message, dict) else {}
+    devices = message.get('devices') or []
+    patterns = message.get('patterns') or []
+    if not isinstance(devices, list) or not isinstance(patterns, list):
+        return {'status': 'error', 'message': 'devices and patterns must be lists'}
+    # Let patterns match devices that already exist, not only ones seen from now on
+    subscriptions.observe(device_states.all())
+    subscription = subscriptions.subscribe(request.sid, devices, patterns)
+    return {'status': 'success', 'subscription': subscription}
 
 @app.route('/<device_id>/data', methods=['POST'])
 def receive_data(device_id):
-    data = request.get_json()
-    print(data)
+    # Receivers may send the compact struct layout from packet_format instead of JSON
+    if request.mimetype == BINARY_MIMETYPE:
+        try:
+            records = decode_packets(request.get_data(), device_id)
+        except ValueError as exc:
+            return str(exc), 400
+        if len(records) != 1:
+            return "Send multiple packets to /<device_id>/data/batch", 400
+        data = records[0]
+    else:
+        data = request.get_json()
+    if VERBOSE_LOGGING:
+        print(data)
 
     if(data["message"] != "skywalker"):  
         return "Wrong Transmitter", 403 
     
     current_seq = int(data['seq'])
-    
-    # Calculate packet loss
-    # In receive_data function:
-    diff_packet = 0
-    with sqlite3.connect(DATABASE_PATH) as con:
-        cursor = con.cursor()
-        # Fix: Use proper parameter tuple and column name
-        result = cursor.execute("SELECT diffpacket FROM loss WHERE recieverid=?", (device_id,)).fetchone()
-        
-        if result is None:
-            # Device not in table yet, insert it
-            cursor.execute("INSERT INTO loss (recieverid, diffpacket) VALUES (?,?)", (device_id, 0))
-            diff_packet = 0
-        else:
-            diff_packet = result[0]
-        
-        if device_id in last_seq:
-            expected_seq = last_seq[device_id] + 1
-            if current_seq > expected_seq:
-                packets_lost_now = current_seq - expected_seq
-                diff_packet += packets_lost_now
-                cursor.execute("UPDATE loss SET diffpacket=? WHERE recieverid=?", (diff_packet, device_id))
-        
-        con.commit()
 
+    if not ingest_has_room():
+        return "Ingest queue full, retry later", 503
     
-    # Update last sequence number for this device
-    last_seq[device_id] = current_seq
-    
-    # Store data in the SQLite database with current timestamp
-    current_timestamp = datetime.now().isoformat()
-    with sqlite3.connect(DATABASE_PATH) as conn:
-        cursor = conn.cursor()
-        if(current_seq>0):c_packetloss = round((diff_packet/current_seq)*100,2)
-        else:c_packetloss = 0
-        cursor.execute("INSERT INTO data (device_id, data, seq, packet_loss, timestamp) VALUES (?, ?, ?, ?, ?)",
-                       (device_id, json.dumps(data), current_seq, c_packetloss, current_timestamp))
-        conn.commit()
+    # Calculate packet loss and store data in the SQLite database with current timestamp
+    try:
+        emit_data = ingest_packets(device_id, [data], [current_seq])[0]
+    except queue.Full:
+        return "Ingest queue full, retry later", 503
 
     # Emit update event to all connected clients
-    emit_data = {
-        'device_id': device_id,
-        'data': data,
-        'seq': current_seq,
-        'packet_loss': c_packetloss
-    }
-    print(f"Emitting SocketIO event: {emit_data}")
-    socketio.emit('new_data', emit_data)
+    if VERBOSE_LOGGING:
+        print(f"Emitting SocketIO event: {emit_data}")
+    broadcast([emit_data])
 
     return "Data received and stored", 201
 
+
+@app.route('/<device_id>/data/batch', methods=['POST'])
+def receive_data_batch(device_id):
+    # Receivers that buffer packets upload them as one array of {message, seq, rssi},
+    # or as back-to-back binary packets
+    if request.mimetype == BINARY_MIMETYPE:
+        try:
+            records = decode_packets(request.get_data(), device_id)
+        except ValueError as exc:
+            return str(exc), 400
+    else:
+        records = request.get_json(silent=True)
+    seqs, error = batch_seqs(records)
+    if error:
+        return error
+
+    if not ingest_has_room(len(records)):
+        return "Ingest queue full, retry later", 503
+
+    try:
+        updates = ingest_packets(device_id, records, seqs)
+    except queue.Full:
+        return "Ingest queue full, retry later", 503
+
+    # One update for the whole batch instead of one event per packet
+    broadcast(updates)
+
+    return jsonify({'status': 'success', 'stored_rows': len(updates)}), 201
+
 @app.route('/')
 def index():
-    # Retrieve the latest 20 stored data entries
-    with sqlite3.connect(DATABASE_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT device_id, data, seq, packet_loss, timestamp FROM data ORDER BY id DESC LIMIT 20")
-        rows = cursor.fetchall()
-        # Reverse so newest is at the bottom
-        rows.reverse()
-
-    # HTML template with Socket.IO client script
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>IoT Receiver Monitor</title>
-            
-            <!-- Google Fonts - Inter font family -->
-            <link rel="preconnect" href="https://fonts.googleapis.com">
-            <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-            <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
-            
-            <style>
-                /* CSS Custom Properties - Corporate Color Palette */
-                :root { 
-                    /* Primary Colors */
-                    --color-background: #F9FAFB;
-                    --color-text-primary: #111827;
-                    --color-text-secondary: #6B7280;
-                    --color-white: #FFFFFF;
-                    
-                    /* Status Colors */
-                    --color-success: #16A34A;
-                    --color-warning: #F59E0B;
-                    --color-danger: #DC2626;
-                    --color-info: #2563EB;
-                    
-                    /* UI Colors */
-                    --color-border: #E5E7EB;
-                    --color-surface: #F3F4F6;
-                    --color-surface-alt: #F9FAFB;
-                    
-                    /* Typography */
-                    --font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                    --font-size-xs: 12px;
-                    --font-size-sm: 14px;
-                    --font-size-base: 16px;
-                    --font-size-lg: 18px;
-                    --font-size-xl: 20px;
-                    --font-size-2xl: 24px;
-                    
-                    /* Font Weights */
-                    --font-weight-normal: 400;
-                    --font-weight-medium: 500;
-                    --font-weight-semibold: 600;
-                    --font-weight-bold: 700;
-                    
-                    /* Spacing */
-                    --spacing-xs: 4px;
-                    --spacing-sm: 8px;
-                    --spacing-md: 12px;
-                    --spacing-lg: 16px;
-                    --spacing-xl: 20px;
-                    --spacing-2xl: 24px;
-                    --spacing-3xl: 32px;
-                    
-                    /* Border Radius */
-                    --radius-sm: 6px;
-                    --radius-md: 8px;
-                    --radius-lg: 12px;
-                    
-                    /* Shadows */
-                    --shadow-sm: 0 1px 2px 0 rgba(0, 0, 0, 0.05);
-                    --shadow-md: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-                    
-                    /* Transitions */
-                    --transition-fast: 150ms ease-in-out;
-                    --transition-normal: 200ms ease-in-out;
-                    --transition-slow: 300ms ease-in-out;
-                }
-                
-                /* Base Reset and Typography */
-                * {
-                    box-sizing: border-box;
-                    margin: 0;
-                    padding: 0;
-                }
-                
-                html {
-                    font-size: 16px;
-                    line-height: 1.5;
-                }
-                
-                body {
-                    font-family: var(--font-family);
-                    font-size: var(--font-size-base);
-                    font-weight: var(--font-weight-normal);
-                    color: var(--color-text-primary);
-                    background-color: var(--color-background);
-                    line-height: 1.6;
-                    -webkit-font-smoothing: antialiased;
-                    -moz-osx-font-smoothing: grayscale;
-                }
-                
-                /* Typography Styles */
-                h1, h2, h3, h4, h5, h6 {
-                    font-weight: var(--font-weight-semibold);
-                    line-height: 1.25;
-                    margin-bottom: var(--spacing-md);
-                }
-                
-                h1 {
-                    font-size: var(--font-size-2xl);
-                    font-weight: var(--font-weight-bold);
-                }
-                
-                h2 {
-                    font-size: var(--font-size-xl);
-                }
-                
-                h3 {
-                    font-size: var(--font-size-lg);
-                }
-                
-                p {
-                    margin-bottom: var(--spacing-md);
-                }
-                
-                /* Responsive Breakpoints */
-                /* Mobile First Approach */
-                
-                /* Small devices (landscape phones, 576px and up) */
-                @media (min-width: 576px) {
-                    .container {
-                        max-width: 540px;
-                    }
-                }
-                
-                /* Medium devices (tablets, 768px and up) */
-                @media (min-width: 768px) {
-                    .container {
-                        max-width: 720px;
-                    }
-                    
-                    html {
-                        font-size: 16px;
-                    }
-                }
-                
-                /* Large devices (desktops, 992px and up) */
-                @media (min-width: 992px) {
-                    .container {
-                        max-width: 960px;
-                    }
-                }
-                
-                /* Extra large devices (large desktops, 1200px and up) */
-                @media (min-width: 1200px) {
-                    .container {
-                        max-width: 1140px;
-                    }
-                }
-                
-                /* Container and Layout Utilities */
-                .container {
-                    width: 100%;
-                    padding-right: var(--spacing-lg);
-                    padding-left: var(--spacing-lg);
-                    margin-right: auto;
-                    margin-left: auto;
-                }
-                
-                /* Utility Classes */
-                .text-primary { color: var(--color-text-primary); }
-                .text-secondary { color: var(--color-text-secondary); }
-                .text-success { color: var(--color-success); }
-                .text-warning { color: var(--color-warning); }
-                .text-danger { color: var(--color-danger); }
-                .text-info { color: var(--color-info); }
-                
-                .bg-white { background-color: var(--color-white); }
-                .bg-surface { background-color: var(--color-surface); }
-                .bg-surface-alt { background-color: var(--color-surface-alt); }
-                
-                .font-medium { font-weight: var(--font-weight-medium); }
-                .font-semibold { font-weight: var(--font-weight-semibold); }
-                .font-bold { font-weight: var(--font-weight-bold); }
-                
-                .text-xs { font-size: var(--font-size-xs); }
-                .text-sm { font-size: var(--font-size-sm); }
-                .text-base { font-size: var(--font-size-base); }
-                .text-lg { font-size: var(--font-size-lg); }
-                .text-xl { font-size: var(--font-size-xl); }
-                .text-2xl { font-size: var(--font-size-2xl); }
-                
-                .rounded-sm { border-radius: var(--radius-sm); }
-                .rounded-md { border-radius: var(--radius-md); }
-                .rounded-lg { border-radius: var(--radius-lg); }
-                
-                .shadow-sm { box-shadow: var(--shadow-sm); }
-                .shadow-md { box-shadow: var(--shadow-md); }
-                
-                .transition { transition: all var(--transition-normal); }
-                .transition-fast { transition: all var(--transition-fast); }
-                .transition-slow { transition: all var(--transition-slow); }
-                
-                /* Navigation Bar Component */
-                .navbar {
-                    height: 64px;
-                    background-color: var(--color-white);
-                    box-shadow: var(--shadow-sm);
-                    display: flex;
-                    align-items: center;
-                    justify-content: space-between;
-                    padding: 0 var(--spacing-2xl);
-                    position: sticky;
-                    top: 0;
-                    z-index: 100;
-                    border-bottom: 1px solid var(--color-border);
-                }
-                
-                .navbar-brand {
-                    font-size: var(--font-size-lg);
-                    font-weight: var(--font-weight-bold);
-                    color: var(--color-text-primary);
-                }
-                
-                .navbar-status {
-                    font-size: var(--font-size-sm);
-                    color: var(--color-text-secondary);
-                    font-weight: var(--font-weight-medium);
-                }
-                
-                .navbar-status #last-update {
-                    font-weight: var(--font-weight-semibold);
-                }
-                
-                /* Main Content Container */
-                .main-content {
-                    padding: var(--spacing-2xl);
-                }
-                
-                /* Dashboard Grid Layout */
-                .dashboard-grid {
-                    display: grid;
-                    gap: var(--spacing-2xl);
-                    height: calc(100vh - 64px - (var(--spacing-2xl) * 2)); /* Full height minus navbar and padding */
-                    min-height: 600px;
-                }
-                
-                /* Mobile First - Single Column Layout */
-                .dashboard-grid {
-                    grid-template-columns: 1fr;
-                    grid-template-rows: auto 1fr;
-                    grid-template-areas: 
-                        "receivers"
-                        "feed";
-                }
-                
-                /* Tablet Layout - 768px and up */
-                @media (min-width: 768px) {
-                    .dashboard-grid {
-                        grid-template-columns: 1fr 1fr;
-                        grid-template-rows: auto auto 1fr;
-                        grid-template-areas: 
-                            "receivers receivers"
-                            "receivers receivers"
-                            "feed feed";
-                    }
-                }
-                
-                /* Desktop Layout - 992px and up */
-                @media (min-width: 992px) {
-                    .dashboard-grid {
-                        grid-template-columns: 1fr 1fr;
-                        grid-template-rows: 1fr;
-                        grid-template-areas: "receivers feed";
-                    }
-                }
-                
-                /* Large Desktop Layout - 1200px and up */
-                @media (min-width: 1200px) {
-                    .dashboard-grid {
-                        grid-template-columns: 1.2fr 1fr;
-                        grid-template-areas: "receivers feed";
-                    }
-                }
-                
-                /* Panel Components */
-                .receivers-panel {
-                    grid-area: receivers;
-                    background-color: var(--color-white);
-                    border-radius: var(--radius-lg);
-                    box-shadow: var(--shadow-sm);
-                    padding: var(--spacing-2xl);
-                    overflow: hidden;
-                    display: flex;
-                    flex-direction: column;
-                }
-                
-                .live-feed-panel {
-                    grid-area: feed;
-                    background-color: var(--color-white);
-                    border-radius: var(--radius-lg);
-                    box-shadow: var(--shadow-sm);
-                    padding: var(--spacing-2xl);
-                    overflow: hidden;
-                    display: flex;
-                    flex-direction: column;
-                }
-                
-                /* Panel Headers */
-                .panel-header {
-                    margin-bottom: var(--spacing-xl);
-                    padding-bottom: var(--spacing-md);
-                    border-bottom: 1px solid var(--color-border);
-                }
-                
-                .panel-title {
-                    font-size: var(--font-size-lg);
-                    font-weight: var(--font-weight-semibold);
-                    color: var(--color-text-primary);
-                    margin: 0;
-                }
-                
-                /* Receivers Grid Container */
-                .receivers-grid {
-                    display: grid;
-                    gap: var(--spacing-lg);
-                    flex: 1;
-                    overflow-y: auto;
-                }
-                
-                /* Mobile - Single column for receiver cards */
-                .receivers-grid {
-                    grid-template-columns: 1fr;
-                }
-                
-                /* Tablet - 2x2 grid for receiver cards */
-                @media (min-width: 768px) {
-                    .receivers-grid {
-                        grid-template-columns: repeat(2, 1fr);
-                    }
-                }
-                
-                /* Desktop - Flexible columns based on available space */
-                @media (min-width: 992px) {
-                    .receivers-grid {
-                        grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-                    }
-                }
-                
-                /* Receiver Card Component - Enhanced Visual Elements */
-                .receiver-card {
-                    width: 320px;
-                    height: 200px;
-                    background-color: var(--color-white);
-                    border-radius: var(--radius-lg);
-                    box-shadow: var(--shadow-sm);
-                    border: 1px solid var(--color-border);
-                    display: flex;
-                    flex-direction: column;
-                    overflow: hidden;
-                    transition: all var(--transition-normal);
-                    position: relative;
-                    justify-self: center; /* Center cards in grid */
-                }
-                
-                /* Card Hover Effects */
-                .receiver-card:hover {
-                    box-shadow: var(--shadow-md);
-                    transform: translateY(-2px);
-                }
-                
-                /* Card Update Flash Animation - Requirements 2.8 */
-                .receiver-card.flash-update {
-                    border: 2px solid #2563EB;
-                    animation: flashBorder 500ms ease-out;
-                }
-                
-                @keyframes flashBorder {
-                    0% {
-                        border-color: #2563EB;
-                        box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.3);
-                    }
-                    100% {
-                        border-color: var(--color-border);
-                        box-shadow: var(--shadow-sm);
-                    }
-                }
-                
-                /* Responsive card sizing */
-                @media (max-width: 767px) {
-                    .receiver-card {
-                        width: 100%;
-                        max-width: 320px;
-                        height: 200px;
-                    }
-                }
-                
-                /* Card Header */
-                .card-header {
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    padding: var(--spacing-lg);
-                    border-bottom: 1px solid var(--color-border);
-                    background-color: var(--color-white);
-                }
-                
-                .receiver-name {
-                    font-size: var(--font-size-base);
-                    font-weight: var(--font-weight-bold);
-                    color: var(--color-text-primary);
-                    margin: 0;
-                }
-                
-                /* Status Badge Styling - Enhanced - Requirements 5.3, 5.4, 5.5 */
-                .status-badge {
-                    font-size: var(--font-size-xs);
-                    font-weight: var(--font-weight-medium);
-                    padding: var(--spacing-xs) var(--spacing-sm);
-                    border-radius: var(--radius-sm);
-                    text-transform: uppercase;
-                    letter-spacing: 0.025em;
-                    transition: all var(--transition-normal);
-                    box-shadow: var(--shadow-sm);
-                    border: 1px solid transparent;
-                }
-                
-                /* Active Status Badge - Requirements 5.4 */
-                .status-badge[data-status="active"] {
-                    background-color: #16A34A; /* Requirement 5.4 - #16A34A background */
-                    color: var(--color-white);
-                    border-color: #15803D;
-                }
-                
-                .status-badge[data-status="active"]:hover {
-                    background-color: #15803D;
-                    transform: translateY(-1px);
-                }
-                
-                /* Disconnected Status Badge - Requirements 5.5 */
-                .status-badge[data-status="disconnected"] {
-                    background-color: #DC2626; /* Requirement 5.5 - #DC2626 background */
-                    color: var(--color-white);
-                    border-color: #B91C1C;
-                }
-                
-                .status-badge[data-status="disconnected"]:hover {
-                    background-color: #B91C1C;
-                    transform: translateY(-1px);
-                }
-                
-                /* Card Body */
-                .card-body {
-                    flex: 1;
-                    padding: var(--spacing-lg);
-                    display: grid;
-                    grid-template-columns: 1fr 1fr;
-                    grid-template-rows: auto auto;
-                    gap: var(--spacing-md);
-                    position: relative;
-                }
-                
-                /* Device ID Display - Enhanced Prominence - Requirements 2.4 */
-                .device-id {
-                    grid-column: 1 / -1;
-                    font-size: var(--font-size-2xl);
-                    font-weight: var(--font-weight-bold);
-                    color: var(--color-text-primary);
-                    text-align: center;
-                    margin-bottom: var(--spacing-sm);
-                    letter-spacing: 0.025em;
-                    text-transform: uppercase;
-                    background: linear-gradient(135deg, var(--color-text-primary) 0%, #374151 100%);
-                    -webkit-background-clip: text;
-                    -webkit-text-fill-color: transparent;
-                    background-clip: text;
-                    text-shadow: 0 1px 2px rgba(0, 0, 0, 0.1);
-                }
-                
-                /* RSSI Display - Enhanced Color-Coding System */
-                .rssi-display {
-                    display: flex;
-                    flex-direction: column;
-                    align-items: center;
-                    justify-content: center;
-                    padding: var(--spacing-sm);
-                    border-radius: var(--radius-md);
-                    transition: all var(--transition-normal);
-                }
-                
-                .rssi-value {
-                    font-size: var(--font-size-2xl);
-                    font-weight: var(--font-weight-bold);
-                    line-height: 1;
-                    transition: color var(--transition-normal);
-                }
-                
-                /* RSSI Color-Coding System - Requirements 2.5 */
-                .rssi-value[data-strength="good"] {
-                    color: var(--color-success); /* #16A34A - Green for good signal */
-                }
-                
-                .rssi-value[data-strength="medium"] {
-                    color: var(--color-warning); /* #F59E0B - Amber for medium signal */
-                }
-                
-                .rssi-value[data-strength="poor"] {
-                    color: var(--color-danger); /* #DC2626 - Red for poor signal */
-                }
-                
-                .rssi-label {
-                    font-size: var(--font-size-xs);
-                    color: var(--color-text-secondary);
-                    font-weight: var(--font-weight-medium);
-                    margin-top: var(--spacing-xs);
-                    text-transform: uppercase;
-                    letter-spacing: 0.05em;
-                }
-                
-                /* Packet Loss Indicator - Enhanced SVG Circular Progress - Requirements 2.6 */
-                .packet-loss-indicator {
-                    display: flex;
-                    flex-direction: column;
-                    align-items: center;
-                    justify-content: center;
-                    position: relative;
-                    padding: var(--spacing-sm);
-                }
-                
-                .progress-circle {
-                    width: 48px;
-                    height: 48px;
-                    transform: rotate(-90deg);
-                    filter: drop-shadow(0 1px 2px rgba(0, 0, 0, 0.1));
-                }
-                
-                .progress-bg {
-                    fill: none;
-                    stroke: #E5E7EB; /* Requirement 2.6 - #E5E7EB background */
-                    stroke-width: 4;
-                    cx: 24;
-                    cy: 24;
-                    r: 20;
-                }
-                
-                .progress-arc {
-                    fill: none;
-                    stroke: #2563EB; /* Requirement 2.6 - #2563EB progress arc */
-                    stroke-width: 4;
-                    stroke-linecap: round;
-                    cx: 24;
-                    cy: 24;
-                    r: 20;
-                    stroke-dasharray: 125.66; /* 2 * π * 20 */
-                    stroke-dashoffset: 125.66;
-                    transition: stroke-dashoffset var(--transition-slow);
-                }
-                
-                /* Dynamic Progress Arc Calculations for Any Percentage */
-                .progress-arc[data-percentage="0"] {
-                    stroke-dashoffset: 125.66;
-                }
-                
-                .progress-arc[data-percentage="1"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.01));
-                }
-                
-                .progress-arc[data-percentage="2"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.02));
-                }
-                
-                .progress-arc[data-percentage="3"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.03));
-                }
-                
-                .progress-arc[data-percentage="4"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.04));
-                }
-                
-                .progress-arc[data-percentage="5"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.05));
-                }
-                
-                .progress-arc[data-percentage="10"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.10));
-                }
-                
-                .progress-arc[data-percentage="15"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.15));
-                }
-                
-                .progress-arc[data-percentage="20"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.20));
-                }
-                
-                .progress-arc[data-percentage="25"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.25));
-                }
-                
-                .progress-arc[data-percentage="30"] {
-                    stroke-dashoffset: calc(125.66 - (125.66 * 0.30));
-                }
-                
-                .loss-percentage {
-                    position: absolute;
-                    font-size: var(--font-size-xs);
-                    font-weight: var(--font-weight-semibold);
-                    color: var(--color-text-primary);
-                    text-align: center;
-                    line-height: 1;
-                }
-                
-                /* Sequence Number - Enhanced Positioning - Requirements 2.7 */
-                .sequence-number {
-                    position: absolute;
-                    bottom: var(--spacing-sm);
-                    right: var(--spacing-sm);
-                    font-size: var(--font-size-xs);
-                    color: var(--color-text-secondary);
-                    font-weight: var(--font-weight-medium);
-                    background-color: rgba(255, 255, 255, 0.8);
-                    padding: var(--spacing-xs) var(--spacing-sm);
-                    border-radius: var(--radius-sm);
-                    backdrop-filter: blur(4px);
-                    border: 1px solid rgba(107, 114, 128, 0.2);
-                    font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace;
-                    letter-spacing: 0.05em;
-                }
-                
-                /* Live Feed Container */
-                .feed-content {
-                    flex: 1;
-                    display: flex;
-                    flex-direction: column;
-                    overflow: hidden;
-                }
-                
-                /* Feed Header with Search/Filter - Task 8 - Requirements 5.1, 5.2 */
-                .feed-header {
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    flex-wrap: wrap;
-                    gap: var(--spacing-md);
-                    margin-bottom: var(--spacing-lg);
-                    padding: 0 var(--spacing-xs);
-                }
-
-                .feed-actions {
-                    display: flex;
-                    flex-wrap: wrap;
-                    gap: var(--spacing-sm);
-                }
-
-                .action-button {
-                    border: none;
-                    border-radius: var(--radius-md);
-                    padding: var(--spacing-sm) var(--spacing-xl);
-                    font-size: var(--font-size-sm);
-                    font-weight: var(--font-weight-semibold);
-                    cursor: pointer;
-                    color: var(--color-white);
-                    background-color: var(--color-info);
-                    box-shadow: var(--shadow-sm);
-                    transition: background-color var(--transition-normal), transform var(--transition-fast);
-                }
-
-                .action-button:hover {
-                    transform: translateY(-1px);
-                }
-
-                .action-button:disabled {
-                    opacity: 0.6;
-                    cursor: not-allowed;
-                    transform: none;
-                }
-
-                .action-button--secondary {
-                    background-color: #0f4cd8;
-                }
-
-                .action-button--secondary:hover:not(:disabled) {
-                    background-color: #0c3eb1;
-                }
-
-                .action-button--danger {
-                    background-color: var(--color-danger);
-                }
-
-                .action-button--danger:hover:not(:disabled) {
-                    background-color: #b91c1c;
-                }
-                
-                /* Filter Input Styling - Requirement 5.1 */
-                .filter-input {
-                    width: 240px;
-                    padding: var(--spacing-sm) var(--spacing-md);
-                    border: 1px solid var(--color-border);
-                    border-radius: var(--radius-md);
-                    font-size: var(--font-size-sm);
-                    font-family: var(--font-family);
-                    color: var(--color-text-primary);
-                    background-color: var(--color-white);
-                    transition: all var(--transition-normal);
-                    box-shadow: var(--shadow-sm);
-                }
-                
-                .filter-input:focus {
-                    outline: none;
-                    border-color: var(--color-info);
-                    box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
-                }
-                
-                .filter-input::placeholder {
-                    color: var(--color-text-secondary);
-                    font-style: italic;
-                }
-                
-                /* Responsive filter input */
-                @media (max-width: 767px) {
-                    .feed-header {
-                        justify-content: center;
-                        margin-bottom: var(--spacing-md);
-                    }
-                    
-                    .filter-input {
-                        width: 100%;
-                        max-width: 280px;
-                    }
-
-                    .feed-actions {
-                        width: 100%;
-                        justify-content: center;
-                    }
-                    
-                    .action-button {
-                        flex: 1;
-                        min-width: 140px;
-                    }
-                }
-                
-                /* Responsive Behavior Enhancements */
-                @media (max-width: 767px) {
-                    .main-content {
-                        padding: var(--spacing-lg);
-                    }
-                    
-                    .dashboard-grid {
-                        gap: var(--spacing-lg);
-                        height: auto;
-                        min-height: auto;
-                    }
-                    
-                    .receivers-panel,
-                    .live-feed-panel {
-                        padding: var(--spacing-lg);
-                    }
-                    
-                    /* Make live feed collapsible on mobile */
-                    .live-feed-panel {
-                        max-height: 400px;
-                    }
-                }
-                
-                /* Smooth transitions for responsive changes */
-                .dashboard-grid,
-                .receivers-grid,
-                .receivers-panel,
-                .live-feed-panel {
-                    transition: all var(--transition-normal);
-                }
-                
-                /* Live Feed Table Structure and Styling - Task 7 */
-                /* Requirements: 3.1, 3.2, 3.3, 3.4, 3.8 */
-                
-                /* Scrollable table container with white background and border radius - Requirement 3.1 */
-                .table-container {
-                    flex: 1;
-                    overflow-y: auto;
-                    background-color: var(--color-white);
-                    border-radius: var(--radius-lg);
-                    border: 1px solid var(--color-border);
-                    box-shadow: var(--shadow-sm);
-                }
-                
-                /* Data table styling - Requirements 3.2, 3.4 */
-                .data-table {
-                    width: 100%;
-                    border-collapse: collapse;
-                    font-size: var(--font-size-sm); /* 14px font - Requirement 3.4 */
-                    background-color: var(--color-white);
-                    margin: 0;
-                }
-                
-                /* Sticky header with specified colors - Requirement 3.3 */
-                .sticky-header {
-                    position: sticky;
-                    top: 0;
-                    z-index: 10;
-                }
-                
-                .sticky-header th {
-                    background-color: #F3F4F6; /* Requirement 3.3 - #F3F4F6 background */
-                    color: #6B7280; /* Requirement 3.3 - #6B7280 text */
-                    font-weight: var(--font-weight-bold); /* 14px bold font - Requirement 3.3 */
-                    font-size: var(--font-size-sm);
-                    padding: var(--spacing-md) var(--spacing-lg);
-                    text-align: left;
-                    border: none;
-                    border-bottom: 1px solid var(--color-border);
-                    text-transform: uppercase;
-                    letter-spacing: 0.025em;
-                    white-space: nowrap;
-                }
-                
-                /* Table body styling */
-                .data-table tbody tr {
-                    transition: background-color var(--transition-fast);
-                }
-                
-                /* Alternating row backgrounds - Requirement 3.4 */
-                .data-table tbody tr:nth-child(odd) {
-                    background-color: #FFFFFF; /* Requirement 3.4 - #FFFFFF */
-                }
-                
-                .data-table tbody tr:nth-child(even) {
-                    background-color: #F9FAFB; /* Requirement 3.4 - #F9FAFB */
-                }
-                
-                /* Table cell styling - Requirement 3.4 */
-                .data-table td {
-                    padding: var(--spacing-md) var(--spacing-lg);
-                    border: none;
-                    border-bottom: 1px solid rgba(229, 231, 235, 0.5);
-                    color: var(--color-text-primary);
-                    font-size: var(--font-size-sm); /* 14px font - Requirement 3.4 */
-                    vertical-align: middle;
-                    white-space: nowrap;
-                    overflow: hidden;
-                    text-overflow: ellipsis;
-                }
-                
-                /* Hover effects for better UX */
-                .data-table tbody tr:hover {
-                    background-color: rgba(37, 99, 235, 0.05);
-                }
-                
-                /* Specific column styling */
-                .data-table .device-id-col {
-                    font-weight: var(--font-weight-semibold);
-                    color: var(--color-text-primary);
-                }
-                
-                .data-table .rssi-col {
-                    font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace;
-                    font-weight: var(--font-weight-medium);
-                }
-                
-                .data-table .seq-col,
-                .data-table .packet-loss-col {
-                    font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace;
-                    text-align: center;
-                }
-                
-                .data-table .time-col {
-                    color: var(--color-text-secondary);
-                    font-size: var(--font-size-xs);
-                }
-                
-                .data-table .uid-col {
-                    font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace;
-                    font-size: var(--font-size-xs);
-                    color: var(--color-text-secondary);
-                    max-width: 120px;
-                }
-                
-                /* Responsive table behavior */
-                @media (max-width: 767px) {
-                    .table-container {
-                        border-radius: var(--radius-md);
-                    }
-                    
-                    .sticky-header th,
-                    .data-table td {
-                        padding: var(--spacing-sm) var(--spacing-md);
-                        font-size: var(--font-size-xs);
-                    }
-                    
-                    /* Hide less critical columns on mobile */
-                    .data-table .uid-col,
-                    .data-table .receiver-col {
-                        display: none;
-                    }
-                }
-            </style>
-            
-            <script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.1/socket.io.min.js"></script>
-            <script>
-                let isFullTableLoaded = false;
-                const LIVE_ROW_LIMIT = 20;
-                let isDatabaseLoading = false;
-                let bufferedRows = [];
-
-                function formatTimestamp(timestamp) {
-                    if (!timestamp) {
-                        return '--:--:--';
-                    }
-                    const parsed = new Date(timestamp);
-                    if (!Number.isNaN(parsed.getTime())) {
-                        return parsed.toLocaleTimeString('en-US', {
-                            hour12: false,
-                            hour: '2-digit',
-                            minute: '2-digit',
-                            second: '2-digit'
-                        });
-                    }
-                    if (typeof timestamp === 'string' && timestamp.includes('T')) {
-                        return timestamp.split('T')[1].split('.')[0];
-                    }
-                    return timestamp;
-                }
-
-                function buildReceiverLabel(deviceId) {
-                    if (!deviceId) {
-                        return 'Receiver --';
-                    }
-                    const numericPart = deviceId.replace(/[^0-9]/g, '');
-                    return `Receiver ${numericPart || '--'}`;
-                }
-
-                function createTableRow(rowData) {
-                    const tr = document.createElement('tr');
-                    const cells = [
-                        { className: 'device-id-col', value: rowData.device_id || '--' },
-                        { className: 'receiver-col', value: rowData.receiver_label || buildReceiverLabel(rowData.device_id) },
-                        { className: 'seq-col', value: rowData.seq ?? '--' },
-                        { className: 'packet-loss-col', value: rowData.packet_loss ?? '--' },
-                        { className: 'rssi-col', value: rowData.rssi ?? '--' },
-                        { className: 'time-col', value: rowData.time_display || formatTimestamp(rowData.timestamp) }
-                    ];
-                    cells.forEach(cell => {
-                        const td = document.createElement('td');
-                        td.className = cell.className;
-                        td.textContent = cell.value !== undefined && cell.value !== null ? cell.value : '--';
-                        tr.appendChild(td);
-                    });
-                    return tr;
-                }
-
-                function appendRowToTable(rowData, insertAtTop = false) {
-                    const tableBody = document.getElementById('data-rows');
-                    if (!tableBody) {
-                        return;
-                    }
-                    const newRow = createTableRow(rowData);
-                    if (insertAtTop && tableBody.firstChild) {
-                        tableBody.insertBefore(newRow, tableBody.firstChild);
-                        return;
-                    }
-                    tableBody.appendChild(newRow);
-                }
-
-                function renderTableRows(rows = []) {
-                    const tableBody = document.getElementById('data-rows');
-                    if (!tableBody) {
-                        return;
-                    }
-                    tableBody.innerHTML = '';
-                    rows.forEach(row => {
-                        appendRowToTable({
-                            device_id: row.device_id,
-                            seq: row.seq,
-                            packet_loss: row.packet_loss,
-                            rssi: row.rssi ?? '--',
-                            timestamp: row.timestamp
-                        }, false);
-                    });
-                }
-
-                function enforceLiveRowLimit(limit = LIVE_ROW_LIMIT) {
-                    if (isFullTableLoaded) {
-                        return;
-                    }
-                    const tableBody = document.getElementById('data-rows');
-                    if (!tableBody) {
-                        return;
-                    }
-                    while (tableBody.children.length > limit) {
-                        tableBody.removeChild(tableBody.lastElementChild);
-                    }
-                }
-
-                function flushBufferedRows() {
-                    if (!bufferedRows.length) {
-                        return;
-                    }
-                    bufferedRows.forEach(row => {
-                        appendRowToTable(row, true);
-                    });
-                    bufferedRows = [];
-                    enforceLiveRowLimit();
-                }
-
-                /**
-                 * Filter functionality for live feed table - Task 8
-                 * Requirements: 5.1, 5.2 - Real-time filtering by Device ID
-                 */
-                function applyFilter() {
-                    const filterInput = document.getElementById('device-filter');
-                    if (!filterInput) {
-                        return;
-                    }
-                    const filterValue = filterInput.value.toLowerCase().trim();
-                    const tableBody = document.getElementById('data-rows');
-                    if (!tableBody) {
-                        return;
-                    }
-                    const rows = tableBody.getElementsByTagName('tr');
-                    
-                    // Show/hide rows based on filter - Requirement 5.2
-                    for (let i = 0; i < rows.length; i++) {
-                        const row = rows[i];
-                        const deviceIdCell = row.querySelector('.device-id-col');
-                        
-                        if (deviceIdCell) {
-                            const deviceId = deviceIdCell.textContent.toLowerCase();
-                            
-                            // Show row if filter is empty or device ID contains filter text
-                            if (filterValue === '' || deviceId.includes(filterValue)) {
-                                row.style.display = '';
-                            } else {
-                                row.style.display = 'none';
-                            }
-                        }
-                    }
-                }
-
-                async function loadDatabase() {
-                    if (isDatabaseLoading) {
-                        return;
-                    }
-                    const loadButton = document.getElementById('load-db-btn');
-                    if (loadButton) {
-                        loadButton.disabled = true;
-                    }
-                    isDatabaseLoading = true;
-                    try {
-                        const response = await fetch('/data/all');
-                        if (!response.ok) {
-                            throw new Error('Unable to load database.');
-                        }
-                        const payload = await response.json();
-                        renderTableRows(payload.rows || []);
-                        isFullTableLoaded = true;
-                    } catch (error) {
-                        console.error('Failed to load database', error);
-                        alert('Unable to load database. Please check the server logs for details.');
-                    } finally {
-                        isDatabaseLoading = false;
-                        flushBufferedRows();
-                        applyFilter();
-                        if (loadButton) {
-                            loadButton.disabled = false;
-                        }
-                    }
-                }
-
-                async function clearDatabase() {
-                    const shouldClear = confirm('Clearing the database will remove all stored rows. Continue?');
-                    if (!shouldClear) {
-                        return;
-                    }
-                    const clearButton = document.getElementById('clear-db-btn');
-                    if (clearButton) {
-                        clearButton.disabled = true;
-                    }
-                    try {
-                        const response = await fetch('/data/clear', { method: 'POST' });
-                        if (!response.ok) {
-                            throw new Error('Unable to clear database.');
-                        }
-                        const payload = await response.json();
-                        renderTableRows([]);
-                        const receiversContainer = document.getElementById('receivers-container');
-                        if (receiversContainer) {
-                            receiversContainer.innerHTML = '';
-                        }
-                        bufferedRows = [];
-                        isDatabaseLoading = false;
-                        isFullTableLoaded = false;
-                        applyFilter();
-                        alert(`Database cleared (${payload.deleted_rows || 0} rows removed).`);
-                    } catch (error) {
-                        console.error('Failed to clear database', error);
-                        alert('Unable to clear database. Please check the server logs for details.');
-                    } finally {
-                        if (clearButton) {
-                            clearButton.disabled = false;
-                        }
-                    }
-                }
-                
-                document.addEventListener("DOMContentLoaded", function() {
-                    var socket = io();
-                    
-                    // Initialize last update timestamp on page load
-                    var now = new Date();
-                    var timeString = now.toLocaleTimeString('en-US', { 
-                        hour12: false, 
-                        hour: '2-digit', 
-                        minute: '2-digit', 
-                        second: '2-digit' 
-                    });
-                    document.getElementById('last-update').textContent = timeString;
-                    
-                    // Initialize filter functionality - Task 8 - Requirements 5.1, 5.2
-                    const filterInput = document.getElementById('device-filter');
-                    
-                    if (filterInput) {
-                        // Real-time filtering on input - Requirement 5.2
-                        filterInput.addEventListener('input', function() {
-                            applyFilter();
-                        });
-                        
-                        // Also filter on keyup for better responsiveness
-                        filterInput.addEventListener('keyup', function() {
-                            applyFilter();
-                        });
-                        
-                        // Clear filter on Escape key
-                        filterInput.addEventListener('keydown', function(event) {
-                            if (event.key === 'Escape') {
-                                filterInput.value = '';
-                                applyFilter();
-                            }
-                        });
-                    }
-
-                    const loadDbButton = document.getElementById('load-db-btn');
-                    if (loadDbButton) {
-                        loadDbButton.addEventListener('click', loadDatabase);
-                    }
-
-                    const clearDbButton = document.getElementById('clear-db-btn');
-                    if (clearDbButton) {
-                        clearDbButton.addEventListener('click', clearDatabase);
-                    }
-                    
-                    // WebSocket connection status
-                    socket.on('connect', function() {
-                        console.log('WebSocket connected');
-                    });
-                    
-                    socket.on('disconnect', function() {
-                        console.log('WebSocket disconnected');
-                    });
-
-                    /**
-                     * Update receiver card data and trigger flash animation
-                     * Requirements: 2.8, 6.1, 6.2, 6.3
-                     */
-                    function updateReceiverCard(deviceId, data, seq, packetLoss) {
-                        // Find the receiver card for this device
-                        let receiverCard = document.querySelector(`[data-device-id="${deviceId}"]`);
-                        
-                        // If card doesn't exist, create it
-                        if (!receiverCard) {
-                            receiverCard = createReceiverCard(deviceId);
-                        }
-                        
-                        // Update RSSI value and color coding
-                        const rssiValue = receiverCard.querySelector('.rssi-value');
-                        if (rssiValue) {
-                            if (data.rssi) {
-                                rssiValue.textContent = data.rssi;
-                                
-                                // Update RSSI color coding based on signal strength
-                                rssiValue.removeAttribute('data-strength');
-                                if (data.rssi >= -50) {
-                                    rssiValue.setAttribute('data-strength', 'good');
-                                } else if (data.rssi >= -70) {
-                                    rssiValue.setAttribute('data-strength', 'medium');
-                                } else {
-                                    rssiValue.setAttribute('data-strength', 'poor');
-                                }
-                            } else {
-                                rssiValue.textContent = '--';
-                                rssiValue.removeAttribute('data-strength');
-                            }
-                        }
-                        
-                        // Update sequence number
-                        const sequenceNumber = receiverCard.querySelector('.sequence-number');
-                        if (sequenceNumber) {
-                            sequenceNumber.textContent = `Seq: ${seq}`;
-                        }
-                        
-                        // Update packet loss indicator
-                        const lossPercentage = receiverCard.querySelector('.loss-percentage');
-                        const progressArc = receiverCard.querySelector('.progress-arc');
-                        if (lossPercentage && progressArc) {
-                            // Calculate packet loss percentage (simple approximation)
-                            const lossPercent = Math.min(packetLoss, 30); // Cap at 30% for display
-                            lossPercentage.textContent = `${lossPercent}%`;
-                            progressArc.setAttribute('data-percentage', lossPercent.toString());
-                            
-                            // Update stroke-dashoffset for progress arc
-                            const circumference = 125.66; // 2 * π * 20
-                            const offset = circumference - (circumference * (lossPercent / 100));
-                            progressArc.style.strokeDashoffset = offset;
-                        }
-                        
-                        // Update status badge to active when receiving data
-                        const statusBadge = receiverCard.querySelector('.status-badge');
-                        if (statusBadge) {
-                            statusBadge.setAttribute('data-status', 'active');
-                            statusBadge.textContent = 'Active';
-                        }
-                        
-                        // Add flash-update class to trigger animation
-                        receiverCard.classList.add('flash-update');
-                        
-                        // Remove the class after animation completes (500ms)
-                        setTimeout(() => {
-                            receiverCard.classList.remove('flash-update');
-                        }, 500);
-                    }
-
-                    /**
-                     * Create a new receiver card for a device
-                     */
-                    function createReceiverCard(deviceId) {
-                        const container = document.getElementById('receivers-container');
-                        
-                        // Create the card HTML
-                        const cardHTML = `
-                            <div class="receiver-card" data-device-id="${deviceId}">
-                                <div class="card-header">
-                                    <h3 class="receiver-name">${deviceId}</h3>
-                                    <span class="status-badge" data-status="disconnected">Disconnected</span>
-                                </div>
-                                <div class="card-body">
-                                    <div class="device-id">${deviceId}</div>
-                                    <div class="rssi-display">
-                                        <span class="rssi-value">--</span>
-                                        <span class="rssi-label">RSSI</span>
-                                    </div>
-                                    <div class="packet-loss-indicator">
-                                        <svg class="progress-circle">
-                                            <circle class="progress-bg" cx="24" cy="24" r="20"></circle>
-                                            <circle class="progress-arc" cx="24" cy="24" r="20" data-percentage="0"></circle>
-                                        </svg>
-                                        <span class="loss-percentage">0%</span>
-                                    </div>
-                                    <div class="sequence-number">Seq: --</div>
-                                </div>
-                            </div>
-                        `;
-                        
-                        // Create a temporary div to hold the HTML
-                        const tempDiv = document.createElement('div');
-                        tempDiv.innerHTML = cardHTML;
-                        const newCard = tempDiv.firstElementChild;
-                        
-                        // Add the card to the container
-                        container.appendChild(newCard);
-                        
-                        return newCard;
-                    }
-
-                    socket.on('new_data', function(msg) {
-                        console.log('Received new data:', msg); // Debug log
-                        
-                        // Update last update timestamp
-                        var now = new Date();
-                        var timeString = now.toLocaleTimeString('en-US', { 
-                            hour12: false, 
-                            hour: '2-digit', 
-                            minute: '2-digit', 
-                            second: '2-digit' 
-                        });
-                        document.getElementById('last-update').textContent = timeString;
-                        
-                        // Update the corresponding receiver card with new data and flash animation
-                        updateReceiverCard(msg.device_id, msg.data, msg.seq, msg.packet_loss);
-                        
-                        const tableRow = {
-                            device_id: msg.device_id,
-                            seq: msg.seq,
-                            packet_loss: msg.packet_loss,
-                            rssi: msg.data.rssi || '--',
-                            time_display: timeString
-                        };
-
-                        if (isDatabaseLoading) {
-                            bufferedRows.push(tableRow);
-                        } else {
-                            appendRowToTable(tableRow, true);
-                            enforceLiveRowLimit();
-                            applyFilter();
-                        }
-                    });
-
-                });
-            </script>
-        </head>
-        <body>
-            <!-- Navigation Bar Component -->
-            <nav class="navbar">
-                <div class="navbar-brand">IoT Receiver Monitor</div>
-                <div class="navbar-status">Last Update: <span id="last-update">--</span></div>
-            </nav>
-            
-            <div class="main-content">
-                <div class="dashboard-grid">
-                    <!-- Receivers Overview Panel -->
-                    <div class="receivers-panel">
-                        <div class="panel-header">
-                            <h2 class="panel-title">Receiver Overview</h2>
-                        </div>
-                        <div class="receivers-grid" id="receivers-container">
-                            <!-- Receiver cards will be dynamically created when devices send data -->
-                        </div>
-                    </div>
-                    
-                    <!-- Live Feed Panel -->
-                    <div class="live-feed-panel">
-                        <div class="panel-header">
-                            <h2 class="panel-title">Live Data Feed</h2>
-                        </div>
-                        <div class="feed-content">
-                            <!-- Search/Filter Header - Task 8 - Requirements 5.1, 5.2 -->
-                            <div class="feed-header">
-                                <div class="feed-actions">
-                                    <button type="button" class="action-button action-button--secondary" id="load-db-btn">Load Database</button>
-                                    <button type="button" class="action-button action-button--danger" id="clear-db-btn">Clear Database</button>
-                                </div>
-                                <input type="text" class="filter-input" id="device-filter" placeholder="Filter by Device ID..." autocomplete="off">
-                            </div>
-                            <!-- Scrollable table container with proper structure - Task 7 -->
-                            <div class="table-container">
-                                <table class="data-table" id="data-table">
-                                    <!-- Sticky header with proper columns - Requirements 3.2, 3.3 -->
-                                    <thead class="sticky-header">
-                                        <tr>
-                                            <th class="device-id-header">Device ID</th>
-                                            <th class="receiver-header">Receiver</th>
-                                            <th class="seq-header">Seq #</th>
-                                            <th class="packet-loss-header">Packet Loss</th>
-                                            <th class="rssi-header">RSSI</th>
-                                            <th class="time-header">Time</th>
-                                        </tr>
-                                    </thead>
-                                    <!-- Table body with alternating row backgrounds - Requirement 3.4 -->
-                                    <tbody id="data-rows">
-                                        {% for device_id, data, seq, packet_loss, timestamp in rows %}
-                                            {% set data_obj = data|from_json if data else {} %}
-                                            <tr>
-                                                <td class="device-id-col">{{ device_id }}</td>
-                                                <td class="receiver-col">Receiver {{ device_id.replace('RX', '').replace('rx', '') or loop.index }}</td>
-                                                <td class="seq-col">{{ seq }}</td>
-                                                <td class="packet-loss-col">{{ packet_loss }}</td>
-                                                <td class="rssi-col">{{ data_obj.get('rssi', '--') if data_obj else '--' }}</td>
-                                                <td class="time-col">{{ timestamp.split('T')[1].split('.')[0] if timestamp else '--:--:--' }}</td>
-                                            </tr>
-                                        {% endfor %}
-                                    </tbody>
-                                </table>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </body>
-    </html>
+    return render_dashboard(latest_rows(), device_summaries())
+
+
+@app.route('/static/<name>')
+def static_file(name):
+    selected = static_assets.select(name, request.headers.get('Accept-Encoding', ''),
+                                    request.headers.get('If-None-Match', ''))
+    if selected is None:
+        return "Not found", 404
+    status, headers, body = selected
+    return Response(body, status=status, headers=headers)
+
+
+def stored_rows(columns, after_id=None, before_id=None, device_id=None, limit=None, newest_first=False):
+    """Rows with after_id < id < before_id from the live partitions and the archive, in id order"""
+    conditions = []
+    params = []
+    for clause, value in (("id > ?", after_id), ("id < ?", before_id), ("device_id = ?", device_id)):
+        if value is not None:
+            conditions.append(clause)
+            params.append(value)
+    where = " AND ".join(conditions)
+    # Archived ids are all lower than live ones, so one side is read after the other
+    with db.connection(DATABASE_PATH) as conn:
+        live_partitions = partitions.snapshot(conn)
+        if newest_first:
+            rows = partitions.select(conn, columns, where, params, limit=limit, newest_first=True)
+        else:
+            rows = column_archive.select(columns, after_id, before_id, device_id, limit=limit, exclude=live_partitions)
+        remaining = None if limit is None else limit - len(rows)
+        if remaining is None or remaining > 0:
+            if newest_first:
+                rows += column_archive.select(columns, after_id, before_id, device_id, limit=remaining,
+                                              newest_first=True, exclude=live_partitions)
+            else:
+                rows += partitions.select(conn, columns, where, params, limit=remaining)
+    return rows
+
+
+def latest_rows(limit=20):
+    # Retrieve the latest stored data entries
+    rows = stored_rows(('device_id', 'rssi', 'seq', 'packet_loss', 'timestamp'), limit=limit, newest_first=True)
+    # Reverse so newest is at the bottom
+    rows.reverse()
+    return rows
+
+
+def device_summaries():
+    # One row per device, so the receiver cards are complete on first paint
+    with db.connection(DATABASE_PATH) as conn:
+        records = conn.execute("""SELECT device_id, last_seq, last_rssi, packet_loss, packets, last_seen
+                                 FROM device_summary ORDER BY device_id""").fetchall()
+
+    now = datetime.now()
+    devices = []
+    for device_id, last_seq, last_rssi, packet_loss, packets, last_seen in records:
+        try:
+            idle_seconds = (now - datetime.fromisoformat(last_seen)).total_seconds()
+        except (TypeError, ValueError):
+            idle_seconds = None
+        devices.append({
+            'device_id': device_id,
+            'seq': last_seq,
+            'rssi': last_rssi,
+            'packet_loss': packet_loss or 0,
+            'packets': packets,
+            'last_seen': last_seen,
+            'active': idle_seconds is not None and idle_seconds <= DEVICE_ACTIVE_SECONDS
+        })
+    return devices
+
+
+def render_dashboard(rows, devices=()):
+    # templates/dashboard.html is compiled once and cached by Jinja; CSS/JS come from /static
+    return render_template('dashboard.html', rows=rows, devices=devices, asset_url=static_assets.url)
+
+
+def data_etag():
     """
-    
-    return render_template_string(html, rows=rows)
+    Version of everything derived from the data table: the clear generation and the newest data id.
+    AUTOINCREMENT keeps the newest id in sqlite_sequence, so this reads two tiny tables and not data.
+    The generation also goes up when retention drops a partition.
+    """
+    with db.connection(DATABASE_PATH) as conn:
+        generation, last_id = conn.execute(
+            """SELECT (SELECT value FROM meta WHERE key = 'clear_generation'),
+                      (SELECT seq FROM sqlite_sequence WHERE name = ?)""", (partitions.CURRENT,)).fetchone()
+    return f'W/"{generation or 0}-{last_id or 0}"'
+
+
+def compress_response(response):
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    encoding, body = compress(body, request.headers.get('Accept-Encoding', ''))
+    if encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def cacheable_read(view):
+    """
+    Conditional GET and compression for a JSON read of stored data.
+    A poll whose If-None-Match still matches data_etag() gets a 304 without the view running.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # Taken before the view reads, so rows landing in between only make the next poll refetch
+        try:
+            etag = data_etag()
+        except sqlite3.Error:
+            etag = None
+        if etag and etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=304, headers={'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'})
+
+        response = app.make_response(view(*args, **kwargs))
+        if etag and response.status_code == 200:
+            response.headers['ETag'] = etag
+            # Browsers may keep the body but must revalidate before using it
+            response.headers['Cache-Control'] = 'no-cache'
+        return compress_response(response)
+    return wrapper
 
 
 @app.route('/data/all', methods=['GET'])
+@cacheable_read
 def load_all_data():
     if not DATABASE_PATH:
         return jsonify({'status': 'error', 'message': 'Database not initialized'}), 500
     try:
-        with sqlite3.connect(DATABASE_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT device_id, data, seq, packet_loss, timestamp FROM data ORDER BY id DESC")
-            records = cursor.fetchall()
+        before_id, limit = page_args(request.args)
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    try:
+        serialized, next_cursor = data_page(before_id, limit)
     except sqlite3.Error as exc:
         return jsonify({'status': 'error', 'message': str(exc)}), 500
 
-    serialized = []
-    for device_id, data_blob, seq, packet_loss, timestamp in records:
-        payload = {}
-        try:
-            payload = json.loads(data_blob) if data_blob else {}
-        except (json.JSONDecodeError, TypeError):
-            payload = {}
+    return jsonify({'status': 'success', 'rows': serialized, 'next_cursor': next_cursor})
 
-        serialized.append({
-            'device_id': device_id,
-            'seq': seq,
-            'packet_loss': packet_loss,
-            'rssi': payload.get('rssi'),
-            'timestamp': timestamp
-        })
 
-    return jsonify({'status': 'success', 'rows': serialized})
+def page_args(args):
+    # ?before_id= is the next_cursor of the previous page; omit it for the newest rows
+    try:
+        before_id = int(args['before_id']) if args.get('before_id') else None
+        limit = int(args.get('limit') or DATA_PAGE_ROWS)
+    except ValueError:
+        raise ValueError("before_id and limit must be integers")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return before_id, min(limit, DATA_PAGE_MAX_ROWS)
+
+
+def data_page(before_id=None, limit=DATA_PAGE_ROWS):
+    """Newest-first rows with id below before_id, and the cursor for the next page (None after the last)"""
+    # Walks the primary keys from before_id down, so every page costs the same however deep it is
+    records = stored_rows(('id', 'device_id', 'seq', 'packet_loss', 'rssi', 'timestamp'),
+                          before_id=before_id, limit=limit + 1, newest_first=True)
+
+    next_cursor = records[limit - 1][0] if len(records) > limit else None
+    return [{
+        'id': row_id,
+        'device_id': device_id,
+        'seq': seq,
+        'packet_loss': packet_loss,
+        'rssi': rssi,
+        'timestamp': timestamp
+    } for row_id, device_id, seq, packet_loss, rssi, timestamp in records[:limit]], next_cursor
+
+
+@app.route('/data/export', methods=['GET'])
+def export_data():
+    # ?format=ndjson|csv, optional ?device_id= and ?gzip=1 for a .gz download
+    try:
+        export_format, device_id, compress = export_args(request.args)
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+
+    return Response(
+        export_stream(export_format, device_id, compress),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{export_filename(export_format, compress)}"'}
+    )
+
+
+def export_args(args):
+    export_format = args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    return export_format, args.get('device_id') or None, args.get('gzip') in ('1', 'true')
+
+
+def export_filename(export_format, compress):
+    return f"{os.path.splitext(DATABASE_NAME)[0]}.{export_format}" + ('.gz' if compress else '')
+
+
+def export_rows(device_id=None):
+    """Yield lists of data rows, oldest first, at most EXPORT_CHUNK_ROWS at a time"""
+    # One short primary-key range query per chunk rather than one cursor open for the
+    # whole download, so a slow client doesn't pin a read snapshot and stall WAL checkpoints
+    last_id = 0
+    while True:
+        rows = stored_rows(EXPORT_COLUMNS, after_id=last_id, device_id=device_id, limit=EXPORT_CHUNK_ROWS)
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def export_stream(export_format, device_id=None, compress=False):
+    # gzip is streamed too: each chunk is compressed as it is produced
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    for text in export_text(export_format, device_id):
+        data = text.encode('utf-8')
+        if compressor:
+            data = compressor.compress(data)
+        # An empty chunk would end a chunked response early
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
+
+
+def export_text(export_format, device_id=None):
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer)
+        csv_writer.writerow(EXPORT_COLUMNS)
+        for rows in export_rows(device_id):
+            csv_writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for rows in export_rows(device_id):
+            yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), separators=(',', ':')) + '\n' for row in rows)
+
+
+@app.route('/data/query', methods=['GET'])
+@cacheable_read
+def query_data():
+    # ?device_id=&since=&until=&min_seq=&max_seq=&limit=, all optional
+    try:
+        filters = query_args(request.args)
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    try:
+        result = query_rows(**filters)
+    except sqlite3.Error as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 500
+
+    return jsonify({'status': 'success', **result})
+
+
+def query_time(value):
+    # Stored timestamps are naive local ISO strings, so compare against the same form
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.isoformat()
+
+
+def query_args(args):
+    try:
+        filters = {
+            'device_id': args.get('device_id') or None,
+            'since': query_time(args['since']) if args.get('since') else None,
+            'until': query_time(args['until']) if args.get('until') else None,
+            'min_seq': int(args['min_seq']) if args.get('min_seq') else None,
+            'max_seq': int(args['max_seq']) if args.get('max_seq') else None,
+            'limit': int(args.get('limit') or QUERY_MAX_ROWS)
+        }
+    except ValueError:
+        raise ValueError("since/until must be ISO 8601 times and min_seq, max_seq, limit integers")
+    if filters['limit'] < 1:
+        raise ValueError("limit must be positive")
+    filters['limit'] = min(filters['limit'], QUERY_MAX_ROWS)
+    return filters
+
+
+def query_rows(device_id=None, since=None, until=None, min_seq=None, max_seq=None, limit=QUERY_MAX_ROWS):
+    """
+    Rows matching every given filter in time order, as one array per column.
+    since is inclusive and until exclusive; truncated says more rows matched than limit.
+    """
+    # Plain comparisons on indexed columns: each partition's device/timestamp, timestamp
+    # or device/seq index depending on which filters are set
+    conditions = []
+    params = []
+    for clause, value in (("device_id = ?", device_id), ("timestamp >= ?", since), ("timestamp < ?", until),
+                          ("seq >= ?", min_seq), ("seq <= ?", max_seq)):
+        if value is not None:
+            conditions.append(clause)
+            params.append(value)
+    with db.connection(DATABASE_PATH) as conn:
+        live_partitions = partitions.snapshot(conn)
+        records = partitions.select_by_time(conn, QUERY_COLUMNS, " AND ".join(conditions), params, limit=limit + 1)
+    # Older days may be in the archive, filtered with vectorized masks instead of an index
+    archived = column_archive.select_by_time(QUERY_COLUMNS, device_id, since, until, min_seq, max_seq,
+                                             limit=limit + 1, exclude=live_partitions)
+    if archived:
+        time_index = QUERY_COLUMNS.index('timestamp')
+        records = list(heapq.merge(archived, records, key=lambda row: (row[time_index] or '', row[0])))[:limit + 1]
+
+    truncated = len(records) > limit
+    records = records[:limit]
+    return {
+        'count': len(records),
+        'truncated': truncated,
+        'columns': {column: [record[index] for record in records] for index, column in enumerate(QUERY_COLUMNS)}
+    }
+
+
+@app.route('/rollups', methods=['GET'])
+@cacheable_read
+def rollup_data():
+    # ?resolution=1m|1h|1d plus the device_id/since/until/limit filters of /data/query
+    try:
+        resolution, filters = rollup_args(request.args)
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    try:
+        result = rollup_rows(resolution, **filters)
+    except sqlite3.Error as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 500
+
+    return jsonify({'status': 'success', **result})
+
+
+def rollup_args(args):
+    resolution = args.get('resolution', '1m')
+    if resolution not in rollups.ROLLUPS:
+        raise ValueError(f"resolution must be one of {', '.join(rollups.ROLLUPS)}")
+    filters = query_args(args)
+    return resolution, {key: filters[key] for key in ('device_id', 'since', 'until', 'limit')}
+
+
+def rollup_rows(resolution, device_id=None, since=None, until=None, limit=QUERY_MAX_ROWS):
+    with db.connection(DATABASE_PATH) as conn:
+        return rollups.query(conn, resolution, device_id, since, until, limit)
+
+
+@app.route('/analytics', methods=['GET'])
+@cacheable_read
+def analytics_data():
+    # Per-device delivery, loss burst, RSSI and inter-arrival statistics; ?device_id/since/until as /data/query
+    try:
+        filters = analytics_args(request.args)
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    try:
+        result = analytics_summary(**filters)
+    except sqlite3.Error as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 500
+
+    return jsonify({'status': 'success', **result})
+
+
+def analytics_args(args):
+    filters = query_args(args)
+    try:
+        rssi_bin = int(args.get('rssi_bin') or ANALYTICS_RSSI_BIN)
+    except ValueError:
+        raise ValueError("rssi_bin must be an integer")
+    if rssi_bin < 1:
+        raise ValueError("rssi_bin must be positive")
+    return {'device_id': filters['device_id'], 'since': filters['since'], 'until': filters['until'],
+            'rssi_bin': rssi_bin}
+
+
+def analytics_summary(device_id=None, since=None, until=None, rssi_bin=ANALYTICS_RSSI_BIN):
+    with db.connection(DATABASE_PATH) as conn:
+        columns = packet_columns.load(conn, column_archive, device_id, since, until)
+    return analytics.summarize(columns, rssi_bin, SEQ_WINDOW_SIZE)
 
 
 @app.route('/data/clear', methods=['POST'])
 def clear_data():
-    global last_seq
-
     if not DATABASE_PATH:
         return jsonify({'status': 'error', 'message': 'Database not initialized'}), 500
 
     try:
-        with sqlite3.connect(DATABASE_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM data")
-            total_rows = cursor.fetchone()[0]
-            cursor.execute("DELETE FROM data")
-            cursor.execute("DELETE FROM loss")
-            conn.commit()
+        total_rows = delete_all_data()
     except sqlite3.Error as exc:
         return jsonify({'status': 'error', 'message': str(exc)}), 500
 
-    last_seq.clear()
-
     return jsonify({'status': 'success', 'deleted_rows': total_rows})
 
+
+def delete_all_data():
+    # Let queued packets land first so they are cleared too
+    if writer is not None:
+        writer.flush()
+    device_states.clear()
+
+    with db.connection(DATABASE_PATH) as conn:
+        cursor = conn.cursor()
+        # device_summary counts the stored rows per device, so nothing has to scan the partitions
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute("SELECT COALESCE(SUM(packets), 0) FROM device_summary")
+        total_rows = cursor.fetchone()[0]
+        partitions.clear(conn)
+        column_archive.clear()
+        # Unfiltered deletes, which SQLite turns into truncates
+        cursor.execute("DELETE FROM loss")
+        cursor.execute("DELETE FROM receptions")
+        cursor.execute("DELETE FROM reception_epochs")
+        cursor.execute("DELETE FROM device_summary")
+        for table, _, _ in rollups.ROLLUPS.values():
+            cursor.execute(f"DELETE FROM {table}")
+        # New ids keep counting up from the old ones, so the generation is what tells caches
+        cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'clear_generation'")
+    return total_rows
+
+
+@app.route('/loss', methods=['GET'])
+def loss_stats():
+    # Exact loss, duplicate, reorder and reset counters per device
+    try:
+        devices = device_states.all()
+    except sqlite3.Error as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 500
+    return jsonify({'status': 'success', 'devices': devices})
+
+
+@app.route('/packets/<int:seq>', methods=['GET'])
+@cacheable_read
+def packet_receptions(seq):
+    # Every receiver that heard this transmitter seq in its latest epoch, strongest first
+    try:
+        with db.connection(DATABASE_PATH) as conn:
+            receptions = conn.execute(
+                """SELECT epoch, device_id, rssi, received_at FROM receptions
+                   WHERE seq=? AND epoch = (SELECT MAX(epoch) FROM receptions WHERE seq=?)
+                   ORDER BY rssi DESC""",
+                (seq, seq)).fetchall()
+    except sqlite3.Error as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 500
+
+    receivers = [{'device_id': device_id, 'rssi': rssi, 'received_at': received_at}
+                 for _, device_id, rssi, received_at in receptions]
+    return jsonify({
+        'status': 'success',
+        'seq': seq,
+        'epoch': receptions[0][0] if receptions else None,
+        'receivers': receivers,
+        'best_receiver': receivers[0]['device_id'] if receivers else None
+    })
+
+
+@app.route('/packets', methods=['GET'])
+@cacheable_read
+def list_packets():
+    # Per-packet correlation for a seq range: who heard it and who heard it best, one entry per epoch
+    after_seq = request.args.get('after_seq', default=0, type=int)
+    limit = max(1, min(request.args.get('limit', default=100, type=int), 1000))
+    try:
+        with db.connection(DATABASE_PATH) as conn:
+            receptions = conn.execute(
+                """SELECT seq, epoch, device_id, rssi, received_at FROM receptions
+                   WHERE seq IN (SELECT DISTINCT seq FROM receptions WHERE seq > ? ORDER BY seq LIMIT ?)
+                   ORDER BY seq, epoch, rssi DESC""",
+                (after_seq, limit)).fetchall()
+    except sqlite3.Error as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 500
+
+    packets = []
+    for seq, epoch, device_id, rssi, received_at in receptions:
+        if not packets or (packets[-1]['seq'], packets[-1]['epoch']) != (seq, epoch):
+            packets.append({'seq': seq, 'epoch': epoch, 'best_receiver': device_id, 'receivers': []})
+        packets[-1]['receivers'].append({'device_id': device_id, 'rssi': rssi, 'received_at': received_at})
+    return jsonify({'status': 'success', 'packets': packets})
+
+
+@app.route('/packets/stats', methods=['GET'])
+@cacheable_read
+def packet_stats():
+    try:
+        with db.connection(DATABASE_PATH) as conn:
+            # Each epoch numbers its packets from the start again
+            epochs = conn.execute(
+                "SELECT COUNT(DISTINCT seq), MIN(seq), MAX(seq) FROM receptions GROUP BY epoch").fetchall()
+            coverage = conn.execute(
+                "SELECT device_id, COUNT(*), AVG(rssi) FROM receptions GROUP BY device_id ORDER BY device_id"
+            ).fetchall()
+            # Receiver with the strongest RSSI for each packet
+            best = dict(conn.execute(
+                """SELECT device_id, COUNT(*) FROM (
+                       SELECT device_id, ROW_NUMBER() OVER (PARTITION BY epoch, seq ORDER BY rssi DESC) AS rank
+                       FROM receptions)
+                   WHERE rank = 1 GROUP BY device_id""").fetchall())
+    except sqlite3.Error as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 500
+
+    # Packets the transmitter sent in the observed ranges vs packets any receiver heard
+    heard = sum(count for count, _, _ in epochs)
+    sent = sum(last - first + 1 for _, first, last in epochs)
+    first_seq = min((first for _, first, _ in epochs), default=None)
+    last_seq = max((last for _, _, last in epochs), default=None)
+    receivers = [{
+        'device_id': device_id,
+        'packets_heard': count,
+        'coverage': round(count / sent, 4) if sent else 0,
+        'avg_rssi': round(avg_rssi, 2) if avg_rssi is not None else None,
+        'best_receiver_packets': best.get(device_id, 0)
+    } for device_id, count, avg_rssi in coverage]
+    return jsonify({
+        'status': 'success',
+        'first_seq': first_seq,
+        'last_seq': last_seq,
+        'epochs': len(epochs),
+        'packets_sent': sent,
+        'packets_heard': heard,
+        'delivery_ratio': round(heard / sent, 4) if sent else 0,
+        'receivers': receivers
+    })
+
+
+@app.route('/subscriptions', methods=['GET'])
+def subscription_stats():
+    # Connected dashboards and how many of them watch each device
+    return jsonify({'status': 'success', 'subscribers': subscriptions.counts()})
+
+
+@app.route('/ingest/stats', methods=['GET'])
+def ingest_stats():
+    stats = {'write_behind': WRITE_BEHIND_ENABLED}
+    if WRITE_BEHIND_ENABLED:
+        stats.update(get_writer().stats())
+    return jsonify({'status': 'success', 'ingest': stats})
+
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host="0.0.0.0", port=8000, allow_unsafe_werkzeug=True, use_reloader=True)
+    # systemd stops the service with SIGTERM; exit normally so atexit flushes the ingest queue
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if SERVER_PROFILE == 'production':
+        # Prefer gunicorn -c gunicorn.conf.py app:app; this is the fallback without the debugger or reloader
+        socketio.run(app, host="0.0.0.0", port=8000, allow_unsafe_werkzeug=True, log_output=False)
+    else:
+        socketio.run(app, debug=True, host="0.0.0.0", port=8000, allow_unsafe_werkzeug=True, use_reloader=True)
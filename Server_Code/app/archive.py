@@ -0,0 +1,303 @@
+"""
+Cold packet history as per-column NumPy arrays.
+
+Closed day partitions are moved out of SQLite into one directory each:
+
+    <archive>/data_YYYYMMDD/meta.json     row count, id and time range, device dictionary
+    <archive>/data_YYYYMMDD/<column>.npy  one array per column, in id order
+
+Columns use the smallest dtype that holds them: device ids are codes into
+the dictionary in meta.json, RSSI is int16 with RSSI_MISSING for "no
+reading", and timestamps are microseconds since 1970-01-01 of the stored
+local wall-clock time (TIME_MISSING for none). The raw JSON blob isn't
+kept; every column the read APIs return is.
+
+Plain .npy rather than compressed .npz so readers can memory-map the
+arrays: a query only pages in the columns and rows it touches.
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ARCHIVE_COLUMNS = ('id', 'device', 'seq', 'rssi', 'packet_loss', 'timestamp')
+RSSI_MISSING = np.iinfo(np.int16).min
+TIME_MISSING = np.iinfo(np.int64).min
+EPOCH = datetime(1970, 1, 1)
+# Rows read from SQLite per fetch while loading a partition
+READ_CHUNK_ROWS = 50000
+
+
+def to_micros(timestamps):
+    """ISO timestamp strings (or None) to int64 microseconds, TIME_MISSING where there is none"""
+    try:
+        return np.array(timestamps, dtype='datetime64[us]').astype(np.int64)
+    except ValueError:
+        # An unparseable value somewhere; go one at a time and treat those as missing
+        micros = np.full(len(timestamps), TIME_MISSING, dtype=np.int64)
+        for index, timestamp in enumerate(timestamps):
+            try:
+                micros[index] = (datetime.fromisoformat(timestamp) - EPOCH) // timedelta(microseconds=1)
+            except (TypeError, ValueError):
+                pass
+        return micros
+
+
+def partition_arrays(conn, name, after_id=0):
+    """
+    The rows of one partition table with id > after_id as ARCHIVE_COLUMNS arrays in id order,
+    and the device dictionary their device codes index into
+    """
+    total = conn.execute(f"SELECT COUNT(*) FROM {name} WHERE id > ?", (after_id,)).fetchone()[0]
+    arrays = {
+        'id': np.empty(total, dtype=np.int64),
+        'seq': np.empty(total, dtype=np.int64),
+        'rssi': np.empty(total, dtype=np.int16),
+        'packet_loss': np.empty(total, dtype=np.float64),
+        'timestamp': np.empty(total, dtype=np.int64),
+    }
+    device_codes = np.empty(total, dtype=np.int64)
+    devices = {}
+    filled = 0
+    # Chunked so a busy day isn't held as Python objects all at once
+    cursor = conn.execute(f"""SELECT id, device_id, seq, rssi, packet_loss, timestamp FROM {name}
+                              WHERE id > ? ORDER BY id""", (after_id,))
+    while filled < total:
+        chunk = cursor.fetchmany(READ_CHUNK_ROWS)
+        if not chunk:
+            break
+        end = filled + len(chunk)
+        row_ids, device_ids, seqs, rssis, losses, timestamps = zip(*chunk)
+        arrays['id'][filled:end] = row_ids
+        device_codes[filled:end] = [devices.setdefault(device_id, len(devices)) for device_id in device_ids]
+        arrays['seq'][filled:end] = seqs
+        # Anything int16 can't hold isn't a real reading either
+        arrays['rssi'][filled:end] = [rssi if rssi is not None and RSSI_MISSING < rssi <= 32767 else RSSI_MISSING
+                                      for rssi in rssis]
+        arrays['packet_loss'][filled:end] = [loss or 0 for loss in losses]
+        arrays['timestamp'][filled:end] = to_micros(list(timestamps))
+        filled = end
+    for column in arrays:
+        arrays[column] = arrays[column][:filled]
+    arrays['device'] = device_codes[:filled].astype(np.min_scalar_type(max(len(devices) - 1, 0)))
+    return arrays, list(devices)
+
+
+def _first_time(segment):
+    # Where a segment starts in (timestamp, id) order; rows without a time sort first
+    meta = segment.meta
+    return TIME_MISSING if meta['min_time'] is None or meta['untimed'] else meta['min_time']
+
+
+class Segment:
+    """One archived partition; arrays are memory-mapped on first use"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as meta_file:
+            self.meta = json.load(meta_file)
+        self.name = self.meta['partition']
+        self.devices = self.meta['devices']
+        self._codes = {device_id: code for code, device_id in enumerate(self.devices)}
+        self._arrays = {}
+
+    def __getitem__(self, column):
+        array = self._arrays.get(column)
+        if array is None:
+            array = self._arrays[column] = np.load(os.path.join(self.path, f'{column}.npy'), mmap_mode='r')
+        return array
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def device_code(self, device_id):
+        return self._codes.get(device_id)
+
+    def rows(self, indices, columns):
+        """Tuples in the read APIs' column names and types, for the given row positions"""
+        values = []
+        for column in columns:
+            if column == 'device_id':
+                values.append([self.devices[code] for code in self['device'][indices].tolist()])
+            elif column == 'rssi':
+                values.append([None if rssi == RSSI_MISSING else rssi for rssi in self['rssi'][indices].tolist()])
+            elif column == 'timestamp':
+                # TIME_MISSING is NaT, which tolist() turns into None
+                values.append([moment and moment.isoformat()
+                               for moment in self['timestamp'][indices].astype('datetime64[us]').tolist()])
+            elif column == 'packet_loss':
+                # The INTEGER column hands whole percentages back as ints; so does the archive
+                values.append([int(loss) if loss.is_integer() else loss
+                               for loss in self['packet_loss'][indices].tolist()])
+            else:
+                values.append(self[column][indices].tolist())
+        return list(zip(*values))
+
+    def counts_by_device(self):
+        counts = np.bincount(self['device'], minlength=len(self.devices))
+        return {device_id: int(count) for device_id, count in zip(self.devices, counts) if count}
+
+
+class ColumnArchive:
+    """The archive directory: writing partitions into it, and id- or time-ordered reads like partitions.py"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._segments = {}
+
+    def segments(self, exclude=()):
+        """
+        Archived partitions, oldest first. exclude is the partitions still in the database:
+        one that is being archived right now is in both places for a moment and is read from SQLite.
+        """
+        try:
+            entries = sorted(entry for entry in os.listdir(self.directory) if not entry.startswith('.'))
+        except (FileNotFoundError, TypeError):
+            return []
+        segments = []
+        for entry in entries:
+            path = os.path.join(self.directory, entry)
+            segment = self._segments.get(path)
+            if segment is None:
+                try:
+                    segment = self._segments[path] = Segment(path)
+                except FileNotFoundError:
+                    # Expired between the listing and here
+                    continue
+            if segment.name not in exclude:
+                segments.append(segment)
+        # Forget segments that are gone from disk
+        for path in set(self._segments) - {os.path.join(self.directory, entry) for entry in entries}:
+            del self._segments[path]
+        segments.sort(key=lambda segment: segment.meta['first_id'])
+        return segments
+
+    def write(self, conn, name):
+        """Copy a closed partition into the archive; returns its row count. The caller drops the table."""
+        final_path = os.path.join(self.directory, name)
+        if os.path.exists(final_path):
+            return Segment(final_path).meta['rows']
+
+        arrays, devices = partition_arrays(conn, name)
+        filled = len(arrays['id'])
+        if filled == 0:
+            return 0
+
+        known_times = arrays['timestamp'][arrays['timestamp'] != TIME_MISSING]
+        meta = {
+            'partition': name,
+            'rows': filled,
+            'first_id': int(arrays['id'][0]),
+            'last_id': int(arrays['id'][-1]),
+            'min_time': int(known_times.min()) if len(known_times) else None,
+            'max_time': int(known_times.max()) if len(known_times) else None,
+            'untimed': filled - len(known_times),
+            'devices': devices,
+        }
+
+        # Written under a temporary name and renamed, so readers never see half a segment
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = os.path.join(self.directory, f'.{name}.{os.getpid()}')
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        for column in ARCHIVE_COLUMNS:
+            np.save(os.path.join(temp_path, f'{column}.npy'), arrays[column])
+        with open(os.path.join(temp_path, 'meta.json'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        try:
+            os.rename(temp_path, final_path)
+        except OSError:
+            # Another worker archived it first
+            shutil.rmtree(temp_path, ignore_errors=True)
+        return filled
+
+    def remove(self, segment):
+        shutil.rmtree(segment.path, ignore_errors=True)
+        self._segments.pop(segment.path, None)
+
+    def clear(self):
+        for segment in self.segments():
+            self.remove(segment)
+
+    def select(self, columns, after_id=None, before_id=None, device_id=None, limit=None,
+               newest_first=False, exclude=()):
+        """Rows with after_id < id < before_id in id order (newest first if asked), up to limit"""
+        segments = self.segments(exclude)
+        if newest_first:
+            segments.reverse()
+        rows = []
+        for segment in segments:
+            if limit is not None and len(rows) >= limit:
+                break
+            ids = segment['id']
+            start = np.searchsorted(ids, after_id, side='right') if after_id is not None else 0
+            end = np.searchsorted(ids, before_id, side='left') if before_id is not None else len(ids)
+            if start >= end:
+                continue
+            indices = np.arange(start, end)
+            if device_id is not None:
+                code = segment.device_code(device_id)
+                if code is None:
+                    continue
+                indices = indices[segment['device'][start:end] == code]
+            if newest_first:
+                indices = indices[::-1]
+            if limit is not None:
+                indices = indices[:limit - len(rows)]
+            rows.extend(segment.rows(indices, columns))
+        return rows
+
+    def select_by_time(self, columns, device_id=None, since=None, until=None, min_seq=None, max_seq=None,
+                       limit=None, exclude=()):
+        """Rows matching every given filter ordered by (timestamp, id), up to limit; since/until are ISO times"""
+        since_micros = int(to_micros([since])[0]) if since else None
+        until_micros = int(to_micros([until])[0]) if until else None
+        # Sort keys of the matches so far; rows are only built for the ones that make the cut
+        times = np.empty(0, dtype=np.int64)
+        ids = np.empty(0, dtype=np.int64)
+        sources = np.empty(0, dtype=np.int64)
+        positions = np.empty(0, dtype=np.int64)
+        segments = sorted(self.segments(exclude), key=_first_time)
+        for number, segment in enumerate(segments):
+            meta = segment.meta
+            if since_micros is not None and (meta['max_time'] is None or meta['max_time'] < since_micros):
+                continue
+            if until_micros is not None and (meta['min_time'] is None or meta['min_time'] >= until_micros):
+                continue
+            # Segments come in time order, so once limit rows are in hand the rest can only lose
+            if limit is not None and len(times) >= limit and _first_time(segment) > times[-1]:
+                break
+            # Vectorized filter over the whole segment instead of an index
+            mask = np.ones(len(segment), dtype=bool)
+            if device_id is not None:
+                code = segment.device_code(device_id)
+                if code is None:
+                    continue
+                mask &= segment['device'] == code
+            timestamps = segment['timestamp']
+            if since_micros is not None:
+                mask &= timestamps >= since_micros
+            if until_micros is not None:
+                # A missing time never matches a time filter, as with NULL in SQL
+                mask &= (timestamps < until_micros) & (timestamps != TIME_MISSING)
+            if min_seq is not None:
+                mask &= segment['seq'] >= min_seq
+            if max_seq is not None:
+                mask &= segment['seq'] <= max_seq
+            found = np.flatnonzero(mask)
+            times = np.concatenate((times, timestamps[found]))
+            ids = np.concatenate((ids, segment['id'][found]))
+            sources = np.concatenate((sources, np.full(len(found), number)))
+            positions = np.concatenate((positions, found))
+            order = np.lexsort((ids, times))[:limit]
+            times, ids, sources, positions = times[order], ids[order], sources[order], positions[order]
+
+        # Build each segment's rows in one go, then put them back in sort order
+        rows = [None] * len(positions)
+        for number in np.unique(sources).tolist():
+            slots = np.flatnonzero(sources == number)
+            for slot, row in zip(slots.tolist(), segments[number].rows(positions[slots], columns)):
+                rows[slot] = row
+        return rows
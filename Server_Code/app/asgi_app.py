@@ -0,0 +1,299 @@
+"""
+Asyncio variant of the server: the ingest routes, the dashboard and its
+static assets, /data/all and /data/clear, and the same Socket.IO events as
+app.py, on python-socketio's AsyncServer mounted in an ASGI app.
+
+    uvicorn asgi_app:asgi --host 0.0.0.0 --port 8000
+
+Idle dashboard websockets and slow receiver uploads wait on the event loop
+instead of holding a thread each. SQLite work runs on a small thread pool
+through the same helpers app.py uses, so loss accounting, write-behind and
+the schema are shared. Configuration is the IOT_* environment of app.py.
+"""
+import asyncio
+import functools
+import json
+import os
+import queue
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import app as sync_app
+from broadcast import AsyncBroadcastCoalescer
+from negotiation import compress, etag_matches
+from packet_format import BINARY_MIMETYPE, decode_packets
+from subscriptions import SubscriptionRegistry
+
+# SQLite calls block, so they run on this many threads; writes serialize on the database lock anyway
+DB_THREADS = int(os.environ.get('IOT_ASYNC_DB_THREADS', 4))
+
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    logger=sync_app.VERBOSE_LOGGING,
+    engineio_logger=sync_app.VERBOSE_LOGGING,
+    client_manager=socketio.AsyncRedisManager(sync_app.SOCKETIO_MESSAGE_QUEUE) if sync_app.SOCKETIO_MESSAGE_QUEUE else None
+)
+executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix='asgi-db')
+subscriptions = SubscriptionRegistry(sio, distributed=sync_app.SOCKETIO_MESSAGE_QUEUE is not None)
+coalescer = AsyncBroadcastCoalescer(sio, tick_ms=sync_app.BROADCAST_TICK_MS, max_batch=sync_app.BROADCAST_MAX_BATCH,
+                                    route=subscriptions.route)
+
+
+async def run_db(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+async def broadcast(updates):
+    if sync_app.BROADCAST_TICK_MS > 0:
+        coalescer.publish(updates)
+        return
+    for room, room_updates in subscriptions.route(updates):
+        if len(room_updates) == 1:
+            await sio.emit('new_data', room_updates[0], to=room)
+        else:
+            await sio.emit('new_data_batch', {'updates': room_updates}, to=room)
+
+
+@sio.on('connect')
+async def handle_connect(sid, environ):
+    subscriptions.connect(sid)
+
+
+@sio.on('disconnect')
+async def handle_disconnect(sid, reason=None):
+    subscriptions.disconnect(sid)
+
+
+@sio.on('subscribe')
+async def handle_subscribe(sid, message):
+    message = message if isinstance(message, dict) else {}
+    devices = message.get('devices') or []
+    patterns = message.get('patterns') or []
+    if not isinstance(devices, list) or not isinstance(patterns, list):
+        return {'status': 'error', 'message': 'devices and patterns must be lists'}
+    subscriptions.observe(await run_db(sync_app.device_states.all))
+    subscription = subscriptions.subscribe(sid, devices, patterns)
+    return {'status': 'success', 'subscription': subscription}
+
+
+async def read_records(request, device_id):
+    # Same body formats as the Flask routes: JSON, or binary packets from packet_format.
+    # Raises ValueError for a body that can't be parsed
+    body = await request.body()
+    if request.headers.get('content-type', '').split(';')[0].strip() == BINARY_MIMETYPE:
+        return decode_packets(body, device_id)
+    try:
+        return json.loads(body)
+    except ValueError as exc:
+        # Reported as 400 like a bad binary packet, not as a wrong transmitter
+        raise ValueError(f"Invalid JSON body: {exc}") from exc
+
+
+async def receive_data(request):
+    device_id = request.path_params['device_id']
+    try:
+        data = await read_records(request, device_id)
+    except ValueError as exc:
+        return PlainTextResponse(str(exc), 400)
+    if isinstance(data, list):
+        if len(data) != 1:
+            return PlainTextResponse("Send multiple packets to /<device_id>/data/batch", 400)
+        data = data[0]
+
+    if not isinstance(data, dict) or data.get("message") != "skywalker":
+        return PlainTextResponse("Wrong Transmitter", 403)
+    try:
+        current_seq = int(data['seq'])
+    except (KeyError, TypeError, ValueError):
+        return PlainTextResponse("Every packet needs an integer seq", 400)
+
+    if not sync_app.ingest_has_room():
+        return PlainTextResponse("Ingest queue full, retry later", 503)
+    try:
+        updates = await run_db(sync_app.ingest_packets, device_id, [data], [current_seq])
+    except queue.Full:
+        return PlainTextResponse("Ingest queue full, retry later", 503)
+
+    await broadcast(updates)
+    return PlainTextResponse("Data received and stored", 201)
+
+
+async def receive_data_batch(request):
+    device_id = request.path_params['device_id']
+    try:
+        records = await read_records(request, device_id)
+    except ValueError as exc:
+        return PlainTextResponse(str(exc), 400)
+    seqs, error = sync_app.batch_seqs(records)
+    if error:
+        return PlainTextResponse(*error)
+
+    if not sync_app.ingest_has_room(len(records)):
+        return PlainTextResponse("Ingest queue full, retry later", 503)
+    try:
+        updates = await run_db(sync_app.ingest_packets, device_id, records, seqs)
+    except queue.Full:
+        return PlainTextResponse("Ingest queue full, retry later", 503)
+
+    await broadcast(updates)
+    return JSONResponse({'status': 'success', 'stored_rows': len(updates)}, 201)
+
+
+def dashboard_page():
+    rows = sync_app.latest_rows()
+    devices = sync_app.device_summaries()
+    with sync_app.app.app_context():
+        return sync_app.render_dashboard(rows, devices)
+
+
+async def index(request):
+    return HTMLResponse(await run_db(dashboard_page))
+
+
+async def static_file(request):
+    selected = sync_app.static_assets.select(request.path_params['name'],
+                                             request.headers.get('accept-encoding', ''),
+                                             request.headers.get('if-none-match', ''))
+    if selected is None:
+        return PlainTextResponse("Not found", 404)
+    status, headers, body = selected
+    return Response(body, status, headers)
+
+
+def cacheable_read(endpoint):
+    # Same conditional GET and compression as app.cacheable_read
+    @functools.wraps(endpoint)
+    async def wrapper(request):
+        try:
+            etag = await run_db(sync_app.data_etag)
+        except sqlite3.Error:
+            etag = None
+        if etag and etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=304,
+                            headers={'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'})
+
+        response = await endpoint(request)
+        headers = {name: value for name, value in response.headers.items() if name != 'content-length'}
+        headers['vary'] = 'Accept-Encoding'
+        if etag and response.status_code == 200:
+            headers['etag'] = etag
+            headers['cache-control'] = 'no-cache'
+        body = response.body
+        if len(body) >= sync_app.COMPRESS_MIN_BYTES:
+            # Large pages take a few milliseconds to compress, so keep that off the event loop
+            encoding, body = await run_db(compress, body, request.headers.get('accept-encoding', ''))
+            if encoding:
+                headers['content-encoding'] = encoding
+        return Response(body, response.status_code, headers)
+    return wrapper
+
+
+@cacheable_read
+async def load_all_data(request):
+    try:
+        before_id, limit = sync_app.page_args(request.query_params)
+    except ValueError as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 400)
+    try:
+        rows, next_cursor = await run_db(sync_app.data_page, before_id, limit)
+    except sqlite3.Error as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 500)
+    return JSONResponse({'status': 'success', 'rows': rows, 'next_cursor': next_cursor})
+
+
+@cacheable_read
+async def query_data(request):
+    try:
+        filters = sync_app.query_args(request.query_params)
+    except ValueError as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 400)
+    try:
+        result = await run_db(lambda: sync_app.query_rows(**filters))
+    except sqlite3.Error as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 500)
+    return JSONResponse({'status': 'success', **result})
+
+
+@cacheable_read
+async def rollup_data(request):
+    try:
+        resolution, filters = sync_app.rollup_args(request.query_params)
+    except ValueError as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 400)
+    try:
+        result = await run_db(lambda: sync_app.rollup_rows(resolution, **filters))
+    except sqlite3.Error as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 500)
+    return JSONResponse({'status': 'success', **result})
+
+
+@cacheable_read
+async def analytics_data(request):
+    try:
+        filters = sync_app.analytics_args(request.query_params)
+    except ValueError as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 400)
+    try:
+        result = await run_db(lambda: sync_app.analytics_summary(**filters))
+    except sqlite3.Error as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 500)
+    return JSONResponse({'status': 'success', **result})
+
+
+async def export_data(request):
+    try:
+        export_format, device_id, compress = sync_app.export_args(request.query_params)
+    except ValueError as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 400)
+    # Starlette steps a plain generator on its thread pool, so each chunk query stays off the loop
+    return StreamingResponse(
+        sync_app.export_stream(export_format, device_id, compress),
+        media_type='application/gzip' if compress else sync_app.EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{sync_app.export_filename(export_format, compress)}"'}
+    )
+
+
+async def clear_data(request):
+    try:
+        total_rows = await run_db(sync_app.delete_all_data)
+    except sqlite3.Error as exc:
+        return JSONResponse({'status': 'error', 'message': str(exc)}, 500)
+    return JSONResponse({'status': 'success', 'deleted_rows': total_rows})
+
+
+async def subscription_stats(request):
+    return JSONResponse({'status': 'success', 'subscribers': subscriptions.counts()})
+
+
+async def shutdown():
+    # Commit the write-behind queue and device state before the process exits
+    await run_db(sync_app.stop_writer)
+    executor.shutdown()
+
+
+http_app = Starlette(routes=[
+    Route('/', index),
+    Route('/static/{name}', static_file, methods=['GET']),
+    Route('/data/all', load_all_data, methods=['GET']),
+    Route('/data/query', query_data, methods=['GET']),
+    Route('/data/export', export_data, methods=['GET']),
+    Route('/rollups', rollup_data, methods=['GET']),
+    Route('/analytics', analytics_data, methods=['GET']),
+    Route('/data/clear', clear_data, methods=['POST']),
+    Route('/subscriptions', subscription_stats, methods=['GET']),
+    Route('/{device_id}/data', receive_data, methods=['POST']),
+    Route('/{device_id}/data/batch', receive_data_batch, methods=['POST']),
+])
+
+asgi = socketio.ASGIApp(sio, other_asgi_app=http_app, on_shutdown=shutdown)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(asgi, host="0.0.0.0", port=8000, log_level='info' if sync_app.VERBOSE_LOGGING else 'warning')
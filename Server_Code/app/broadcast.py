@@ -0,0 +1,59 @@
+import os
+import threading
+from collections import deque
+
+
+class BroadcastCoalescer:
+    """
+    Gathers new_data updates and emits them as one new_data_batch per tick.
+
+    At high packet rates browsers get a handful of events per second
+    instead of one per packet. If more than max_batch updates pile up in a
+    tick only the newest are kept; the dashboard shows recent rows anyway.
+    route(batch) splits a batch into (room, updates) pairs; by default
+    everyone gets the whole batch.
+    """
+
+    def __init__(self, socketio, tick_ms=150, max_batch=1000, route=None):
+        self.socketio = socketio
+        self.route = route or (lambda batch: [(None, batch)])
+        self.tick = tick_ms / 1000.0
+        self._pending = deque(maxlen=max_batch)
+        self._lock = threading.Lock()
+        self._task_pid = None
+
+    def publish(self, updates):
+        with self._lock:
+            self._pending.extend(updates)
+            # Started lazily, and again in a forked worker where the parent's task doesn't exist
+            if self._task_pid != os.getpid():
+                self._task_pid = os.getpid()
+                self.socketio.start_background_task(self._run)
+
+    def drain(self):
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+        return batch
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.tick)
+            batch = self.drain()
+            if not batch:
+                continue
+            for room, updates in self.route(batch):
+                self.socketio.emit('new_data_batch', {'updates': updates}, to=room)
+
+
+class AsyncBroadcastCoalescer(BroadcastCoalescer):
+    """BroadcastCoalescer for python-socketio's AsyncServer; publish() from the event loop"""
+
+    async def _run(self):
+        while True:
+            await self.socketio.sleep(self.tick)
+            batch = self.drain()
+            if not batch:
+                continue
+            for room, updates in self.route(batch):
+                await self.socketio.emit('new_data_batch', {'updates': updates}, to=room)
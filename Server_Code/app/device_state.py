@@ -0,0 +1,334 @@
+import threading
+
+import db
+import partitions
+
+# Sequence numbers tracked behind the newest one; anything older means the transmitter restarted
+DEFAULT_WINDOW_SIZE = 256
+# A seq at least this far behind the newest one that is also nearer 0 than the newest seq is a
+# restart whose first packets were lost, not a late packet
+RESTART_MIN_JUMP = 16
+
+# Columns of the loss table that hold one device's state, in SeqWindow.to_row() order
+STATE_COLUMNS = ('diffpacket', 'last_seq', 'seen', 'received', 'duplicates', 'reordered', 'resets', 'window')
+
+# Rows are (device_id, *SeqWindow.to_row(), last_id); see DeviceStateCache.flush for last_id
+UPSERT_SQL = f"""INSERT INTO loss (recieverid, {', '.join(STATE_COLUMNS)}, last_id)
+                 VALUES (?, {', '.join('?' for _ in STATE_COLUMNS)}, ?)
+                 ON CONFLICT(recieverid) DO UPDATE SET
+                     {', '.join(f'{column}=excluded.{column}' for column in STATE_COLUMNS)}, last_id=excluded.last_id"""
+
+SELECT_SQL = f"SELECT recieverid, {', '.join(STATE_COLUMNS)} FROM loss"
+
+
+def jumped_back(seqs, offsets, size=DEFAULT_WINDOW_SIZE):
+    """
+    SeqWindow's restart test by distance alone, for arrays: offsets is how far each seq is behind
+    the newest one before it. Seq 1 again is the callers' to check.
+    """
+    return (offsets >= size) | ((offsets >= RESTART_MIN_JUMP) & (2 * seqs <= offsets))
+
+
+class SeqWindow:
+    """
+    Sliding bitmap over the last `size` sequence numbers of one device.
+
+    Bit i of bitmap is set once seq (highest - i) has arrived. A jump ahead
+    counts the skipped seqs as lost; when one of them turns up late it is
+    un-counted as a reorder, a set bit (or the newest seq again) means a
+    duplicate. A seq older than the window, seq 1 again, or a jump back to a
+    small seq (see jumped_back) starts a new epoch after a transmitter reset,
+    even when the first packets after it were lost. Every packet is O(1) and
+    memory is bounded by the window.
+    """
+
+    __slots__ = ('size', 'mask', 'highest', 'bitmap', 'lost', 'seen', 'received',
+                 'duplicates', 'reordered', 'resets')
+
+    def __init__(self, size=DEFAULT_WINDOW_SIZE):
+        self.size = size
+        self.mask = (1 << size) - 1
+        self.highest = None
+        self.bitmap = 0
+        self.lost = 0
+        self.seen = 0
+        self.received = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.resets = 0
+
+    def add(self, seq):
+        self.seen += 1
+        if self.highest is None:
+            self._start_epoch(seq)
+            return
+
+        offset = self.highest - seq
+        if offset < 0:
+            # Newer than anything seen so far: the skipped seqs are lost until they show up
+            self.lost += -offset - 1
+            # A jump past the whole window leaves only the new seq; shifting by it would cost
+            # memory and time in proportion to the jump
+            self.bitmap = ((self.bitmap << -offset) | 1) & self.mask if -offset < self.size else 1
+            self.highest = seq
+            self.received += 1
+        elif (offset >= self.size or (offset >= RESTART_MIN_JUMP and 2 * seq <= offset)
+              or (offset > 0 and seq == 1 and self.bitmap >> offset & 1)):
+            self.resets += 1
+            self._start_epoch(seq)
+        else:
+            bit = 1 << offset
+            if self.bitmap & bit:
+                self.duplicates += 1
+            else:
+                self.bitmap |= bit
+                self.lost -= 1
+                self.reordered += 1
+                self.received += 1
+
+    def _start_epoch(self, seq):
+        # Everything before the first seq of an epoch counts as already accounted for
+        self.highest = seq
+        self.bitmap = self.mask
+        self.received += 1
+
+    @property
+    def packet_loss(self):
+        """Lost packets as a percentage of the packets the transmitter sent"""
+        expected = self.received + self.lost
+        if expected <= 0:
+            return 0
+        return round((self.lost / expected) * 100, 2)
+
+    def counters(self):
+        return {
+            'last_seq': self.highest,
+            'lost': self.lost,
+            'seen': self.seen,
+            'received': self.received,
+            'duplicates': self.duplicates,
+            'reordered': self.reordered,
+            'resets': self.resets,
+            'packet_loss': self.packet_loss
+        }
+
+    def to_row(self):
+        window = self.bitmap.to_bytes(self.size // 8 + 1, 'little')
+        return (self.lost, self.highest, self.seen, self.received, self.duplicates,
+                self.reordered, self.resets, window)
+
+    @classmethod
+    def from_row(cls, row, size=DEFAULT_WINDOW_SIZE):
+        state = cls(size)
+        lost, highest, seen, received, duplicates, reordered, resets, window = row
+        state.lost = int(lost or 0)
+        state.highest = highest
+        state.seen = seen or 0
+        # Rows written before the window existed only know the gap count
+        state.received = received if received is not None else max(state.seen - state.lost, 0)
+        state.duplicates = duplicates or 0
+        state.reordered = reordered or 0
+        state.resets = resets or 0
+        if window is not None:
+            state.bitmap = int.from_bytes(window, 'little') & state.mask
+        elif highest is not None:
+            state.bitmap = state.mask
+        return state
+
+
+class DeviceStateCache:
+    """
+    Authoritative per-device sequence windows and loss counters.
+
+    The ingest path only touches this in-memory map; changed devices are
+    written back to the loss table by a background thread every
+    persist_interval_ms, and the map is rebuilt from loss/data on startup.
+    """
+
+    def __init__(self, persist_interval_ms=1000, window_size=DEFAULT_WINDOW_SIZE):
+        self.persist_interval = persist_interval_ms / 1000.0
+        self.window_size = window_size
+        self.database_path = None
+        self._devices = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def load(self, database_path):
+        """Rebuild the cache from the loss table, catching up from data where it lags"""
+        devices = {}
+        after_ids = {}
+        with db.connection(database_path) as conn:
+            for row in conn.execute(f"SELECT recieverid, {', '.join(STATE_COLUMNS)}, last_id FROM loss"):
+                state = SeqWindow.from_row(row[1:-1], self.window_size)
+                # Without a last seq the stored gap count can't be continued; replay data instead
+                if state.highest is None:
+                    continue
+                devices[row[0]] = state
+                # No last_id means the state was written together with the rows (shared mode,
+                # recompute_loss) and is already complete
+                if row[-1] is not None:
+                    after_ids[row[0]] = row[-1]
+
+            # Rows stored after the last state flush are replayed, and every row of a device
+            # without usable state. Ids rather than counts, so archived and expired days don't matter.
+            for device_id in partitions.count_by_device(conn):
+                if device_id not in devices:
+                    devices[device_id] = SeqWindow(self.window_size)
+                    after_ids[device_id] = 0
+            for device_id, after_id in after_ids.items():
+                seqs = partitions.select(conn, ('seq',), "device_id = ? AND id > ?", (device_id, after_id))
+                for (seq,) in seqs:
+                    devices[device_id].add(seq)
+
+        with self._lock:
+            self.database_path = database_path
+            self._devices = devices
+            self._dirty = set(devices)
+
+    def record(self, device_id, current_seq, conn=None):
+        """
+        Account for one packet. Returns the device's packet loss percentage, how much
+        this packet changed its lost count (negative when a gap is filled late) and its
+        received count (0 for a duplicate), and how many transmitter resets this
+        receiver has seen.
+        """
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is None:
+                state = self._devices[device_id] = SeqWindow(self.window_size)
+            lost_before, received_before = state.lost, state.received
+            state.add(current_seq)
+            packet_loss = state.packet_loss
+            lost_change = state.lost - lost_before
+            received_change = state.received - received_before
+            resets = state.resets
+            self._dirty.add(device_id)
+
+        self._start()
+        return packet_loss, lost_change, received_change, resets
+
+    def get(self, device_id):
+        with self._lock:
+            state = self._devices.get(device_id)
+            return state.counters() if state is not None else None
+
+    def all(self):
+        with self._lock:
+            return {device_id: state.counters() for device_id, state in sorted(self._devices.items())}
+
+    def clear(self):
+        # Wait for an in-flight flush so it can't write old counters back afterwards
+        with self._flush_lock, self._lock:
+            self._devices.clear()
+            self._dirty.clear()
+
+    def flush(self):
+        """Write every changed device back to the loss table"""
+        with self._flush_lock:
+            with self._lock:
+                database_path = self.database_path
+                if not self._dirty or not database_path:
+                    return
+            rows = []
+            try:
+                with db.connection(database_path) as conn:
+                    # Read before the states: every row up to here was recorded before it was stored,
+                    # so it is in them. Rows stored later may be too; replaying one of those again on
+                    # startup only counts it as a duplicate.
+                    last_id = partitions.last_id(conn)
+                    with self._lock:
+                        rows = [(device_id,) + self._devices[device_id].to_row() + (last_id,)
+                                for device_id in self._dirty if device_id in self._devices]
+                        self._dirty.clear()
+                    conn.executemany(UPSERT_SQL, rows)
+            except Exception:
+                # Retry these devices on the next flush
+                with self._lock:
+                    self._dirty.update(row[0] for row in rows)
+                raise
+
+    def stop(self):
+        if self._thread is not None:
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _start(self):
+        # A forked worker inherits the attribute but not the thread itself
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._wakeup.clear()
+                    self._thread = threading.Thread(target=self._run, name='device-state-persister', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._wakeup.wait(self.persist_interval):
+            try:
+                self.flush()
+            except Exception as exc:
+                print(f"Persisting device state failed: {exc}")
+
+
+class SharedDeviceState:
+    """
+    Device state kept in the loss table itself, for several worker processes.
+
+    Each packet takes SQLite's write lock (BEGIN IMMEDIATE), reads the
+    device's window, advances it and writes it back, so concurrent workers
+    serialize instead of racing a read-modify-write. Pass the ingest
+    transaction's connection to record() so the loss update and the data
+    row commit together.
+    """
+
+    def __init__(self, window_size=DEFAULT_WINDOW_SIZE):
+        self.window_size = window_size
+        self.database_path = None
+
+    def load(self, database_path):
+        # Nothing to rebuild, the table is the state
+        self.database_path = database_path
+
+    def record(self, device_id, current_seq, conn=None):
+        """Account for one packet; returns (packet loss percentage, changes in lost and received counts, resets)"""
+        if conn is None:
+            with db.connection(self.database_path) as own_conn:
+                return self._record(own_conn, device_id, current_seq)
+        return self._record(conn, device_id, current_seq)
+
+    def _record(self, conn, device_id, current_seq):
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute(SELECT_SQL + " WHERE recieverid=?", (device_id,)).fetchone()
+        if row is None:
+            state = SeqWindow(self.window_size)
+        else:
+            state = SeqWindow.from_row(row[1:], self.window_size)
+        lost_before, received_before = state.lost, state.received
+        state.add(current_seq)
+        conn.execute(UPSERT_SQL, (device_id,) + state.to_row() + (None,))
+        return state.packet_loss, state.lost - lost_before, state.received - received_before, state.resets
+
+    def get(self, device_id):
+        with db.connection(self.database_path) as conn:
+            row = conn.execute(SELECT_SQL + " WHERE recieverid=?", (device_id,)).fetchone()
+        return SeqWindow.from_row(row[1:], self.window_size).counters() if row is not None else None
+
+    def all(self):
+        with db.connection(self.database_path) as conn:
+            rows = conn.execute(SELECT_SQL + " ORDER BY recieverid").fetchall()
+        return {row[0]: SeqWindow.from_row(row[1:], self.window_size).counters() for row in rows}
+
+    def clear(self):
+        # clear_data empties the loss table
+        pass
+
+    def flush(self):
+        pass
+
+    def stop(self):
+        pass
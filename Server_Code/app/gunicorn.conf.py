@@ -0,0 +1,47 @@
+import os
+import signal
+import threading
+
+# Production profile: gunicorn -c gunicorn.conf.py app:app
+#
+# Flask-SocketIO runs in threading mode and serves websockets through
+# simple-websocket, which needs the gthread worker. Each open websocket holds
+# one thread, so IOT_THREADS bounds dashboards plus concurrent requests per worker.
+#
+# More than one worker switches device state to the shared loss table (see
+# IOT_DEVICE_STATE in app.py). Socket.IO polling then needs sticky sessions at
+# the proxy, and IOT_SOCKETIO_MESSAGE_QUEUE so every worker's updates reach
+# every dashboard.
+os.environ.setdefault('IOT_SERVER_PROFILE', 'production')
+
+bind = os.environ.get('IOT_BIND', '0.0.0.0:8000')
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = int(os.environ.get('IOT_THREADS', 100))
+
+# Quiet by default: warnings and errors only, no access log
+loglevel = os.environ.get('IOT_LOG_LEVEL', 'warning')
+accesslog = os.environ.get('IOT_ACCESS_LOG') or None
+
+# Seconds a stopping worker gets to finish requests and flush the ingest queue
+graceful_timeout = int(os.environ.get('IOT_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+
+def post_worker_init(worker):
+    # gunicorn's SIGTERM handler only stops accepting; also close the dashboards'
+    # websockets so their threads don't keep the worker alive until it's killed
+    import app
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        handle_exit(signum, frame)
+        threading.Thread(target=app.disconnect_clients, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    # Commit the write-behind queue and device state before the worker goes away
+    import app
+    app.stop_writer()
@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+
+import db
+
+
+class WriteBehindWriter:
+    """
+    Background writer that group-commits queued ingest requests.
+
+    Request handlers submit all statements of one request as a single item
+    and return immediately; the writer thread commits everything that
+    arrived within max_delay_ms (or as soon as max_batch_packets are
+    waiting) in a single transaction. The queue is sized and reported in
+    packets, so a request is either queued whole or not at all.
+    """
+
+    def __init__(self, database_path, max_delay_ms=50, max_batch_packets=500, max_queue=10000):
+        self.database_path = database_path
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_batch_packets = max_batch_packets
+        self.max_queue = max_queue
+        self._queue = queue.Queue()
+        # Packets queued or being written; submit() waits on this for room
+        self._pending = 0
+        self._room = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.packets_written = 0
+        self.flushes = 0
+        self.failed_packets = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+                self._thread.start()
+
+    def _fits(self, packets):
+        # A request bigger than the whole queue still goes through once the queue is empty
+        return self._pending == 0 or self._pending + packets <= self.max_queue
+
+    def has_room(self, packets=1):
+        with self._room:
+            return self._fits(packets)
+
+    def depth(self):
+        return self._pending
+
+    def submit(self, statements, packets, timeout=1.0):
+        """
+        Queue one request: statements is a list of (sql, [params, ...]) run with executemany,
+        packets how many packets they store. Raises queue.Full if the writer can't keep up.
+        """
+        self.start()
+        with self._room:
+            if not self._room.wait_for(lambda: self._fits(packets), timeout=timeout):
+                raise queue.Full
+            self._pending += packets
+        self._queue.put((statements, packets))
+
+    def flush(self):
+        """Block until everything queued so far has been committed"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self):
+        """Flush the remaining packets and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        return {
+            'queue_depth': self.depth(),
+            'queue_capacity': self.max_queue,
+            'max_delay_ms': round(self.max_delay * 1000),
+            'max_batch_packets': self.max_batch_packets,
+            'packets_written': self.packets_written,
+            'failed_packets': self.failed_packets,
+            'flushes': self.flushes,
+            'last_flush_ms': self.last_flush_ms,
+        }
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+
+            # Gather whatever else arrives before the durability deadline
+            batch = [first]
+            packets = first[1]
+            deadline = time.monotonic() + self.max_delay
+            while packets < self.max_batch_packets:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                packets += batch[-1][1]
+            # On shutdown take everything that is left without waiting
+            while self._stop.is_set() and packets < self.max_batch_packets:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                packets += batch[-1][1]
+
+            self._write(batch, packets)
+            with self._room:
+                self._pending -= packets
+                self._room.notify_all()
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch, packets):
+        started = time.perf_counter()
+        # Each statement goes through one executemany for the whole batch; every statement
+        # writes its own table, so only the order within a statement matters
+        grouped = {}
+        for statements, _ in batch:
+            for sql, params in statements:
+                grouped.setdefault(sql, []).extend(params)
+        try:
+            with db.connection(self.database_path) as conn:
+                for sql, params in grouped.items():
+                    conn.executemany(sql, params)
+        except Exception as exc:
+            self.failed_packets += packets
+            print(f"Write-behind flush of {packets} packets failed: {exc}")
+            return
+        self.packets_written += packets
+        self.flushes += 1
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
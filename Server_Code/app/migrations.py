@@ -0,0 +1,226 @@
+from datetime import datetime
+
+import partitions
+import rollups
+
+
+def table_columns(conn, table):
+    return [column[1] for column in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone() is not None
+
+
+# Databases created before user_version was tracked may already have some of
+# these changes, so every step checks before it alters anything.
+
+def create_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS data (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        device_id TEXT NOT NULL,
+                        seq INTEGER NOT NULL,
+                        packet_loss INTEGER DEFAULT 0,
+                        data TEXT NOT NULL,
+                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS loss(
+                   recieverid TEXT PRIMARY KEY,
+                   diffpacket REAL DEFAULT 0)
+                   ''')
+    # Check if timestamp column exists and add it if it doesn't (for existing databases)
+    if 'timestamp' not in table_columns(conn, 'data'):
+        # SQLite doesn't allow non-constant defaults in ALTER TABLE, so we add without default
+        conn.execute('ALTER TABLE data ADD COLUMN timestamp DATETIME')
+        # Update existing rows with current timestamp
+        current_time = datetime.now().isoformat()
+        conn.execute('UPDATE data SET timestamp = ? WHERE timestamp IS NULL', (current_time,))
+
+
+def add_device_state_columns(conn):
+    # Persist the rest of the device state next to the lost packet count
+    loss_columns = table_columns(conn, 'loss')
+    if 'last_seq' not in loss_columns:
+        conn.execute('ALTER TABLE loss ADD COLUMN last_seq INTEGER')
+    if 'seen' not in loss_columns:
+        conn.execute('ALTER TABLE loss ADD COLUMN seen INTEGER DEFAULT 0')
+
+
+def create_receptions(conn):
+    # Cross-receiver correlation: which receivers heard each transmitter seq
+    has_receptions = table_exists(conn, 'receptions')
+    conn.execute('''CREATE TABLE IF NOT EXISTS receptions (
+                        seq INTEGER NOT NULL,
+                        device_id TEXT NOT NULL,
+                        rssi INTEGER,
+                        received_at DATETIME NOT NULL,
+                        PRIMARY KEY (seq, device_id)) WITHOUT ROWID''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_receptions_device ON receptions (device_id, seq)')
+    if not has_receptions:
+        # Index the packets stored before the table existed, oldest receipt first
+        conn.execute('''INSERT OR IGNORE INTO receptions (seq, device_id, rssi, received_at)
+                        SELECT seq, device_id, json_extract(data, '$.rssi'), COALESCE(timestamp, '')
+                        FROM data WHERE json_valid(data) ORDER BY id''')
+
+
+def add_rssi_column(conn):
+    # Typed RSSI column so read paths don't have to decode the JSON blob
+    if 'rssi' not in table_columns(conn, 'data'):
+        conn.execute('ALTER TABLE data ADD COLUMN rssi INTEGER')
+
+    # Copy rssi out of the JSON blobs in the migration's own transaction, so the copy and
+    # the version bump commit together; an interrupted run leaves neither
+    conn.execute("UPDATE data SET rssi = json_extract(data, '$.rssi') WHERE json_valid(data)")
+
+
+def create_data_indexes(conn):
+    # Per-device history and the per-device MAX(id)/COUNT(*) rebuild
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_data_device_id ON data (device_id, id)')
+    # Time-range queries
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_data_timestamp ON data (timestamp)')
+    # Sequence lookups per device
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_data_device_seq ON data (device_id, seq)')
+
+
+def add_seq_window_columns(conn):
+    # Reorder/duplicate counters and the sliding sequence bitmap per device
+    loss_columns = table_columns(conn, 'loss')
+    for column, column_type in (('received', 'INTEGER'), ('duplicates', 'INTEGER DEFAULT 0'),
+                                ('reordered', 'INTEGER DEFAULT 0'), ('resets', 'INTEGER DEFAULT 0'),
+                                ('window', 'BLOB')):
+        if column not in loss_columns:
+            conn.execute(f'ALTER TABLE loss ADD COLUMN {column} {column_type}')
+
+
+def create_device_time_index(conn):
+    # One device over a time range, returned in time order
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_data_device_timestamp ON data (device_id, timestamp)')
+
+
+def create_rollup_tables(conn):
+    # Per-device minute/hour/day aggregates, seeded from the rows already stored
+    has_rollups = table_exists(conn, rollups.ROLLUPS['1m'][0])
+    rollups.create_tables(conn)
+    if not has_rollups:
+        rollups.backfill(conn)
+
+
+def create_device_summary(conn):
+    # Latest reading per device for the receiver cards, seeded from each device's newest row
+    has_summary = table_exists(conn, 'device_summary')
+    conn.execute('''CREATE TABLE IF NOT EXISTS device_summary (
+                        device_id TEXT PRIMARY KEY,
+                        last_seq INTEGER,
+                        last_rssi INTEGER,
+                        packet_loss REAL DEFAULT 0,
+                        packets INTEGER NOT NULL DEFAULT 0,
+                        last_seen DATETIME)''')
+    if not has_summary:
+        conn.execute('''INSERT INTO device_summary (device_id, last_seq, last_rssi, packet_loss, packets, last_seen)
+                        SELECT data.device_id, data.seq, data.rssi, data.packet_loss, latest.packets, data.timestamp
+                        FROM (SELECT device_id, MAX(id) AS id, COUNT(*) AS packets FROM data GROUP BY device_id) AS latest
+                        JOIN data ON data.id = latest.id''')
+
+
+def create_server_meta(conn):
+    # Small counters the server keeps next to the data; clear_generation goes up on every clear
+    conn.execute('''CREATE TABLE IF NOT EXISTS meta (
+                        key TEXT PRIMARY KEY,
+                        value INTEGER NOT NULL DEFAULT 0)''')
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('clear_generation', 0)")
+
+
+def partition_data_table(conn):
+    # One table per day behind a data view; the existing table becomes the first partition
+    partitions.partition_table(conn)
+
+
+def add_loss_last_id(conn):
+    # Newest data id already accounted in a device's state; startup replays the rows after it
+    if 'last_id' not in table_columns(conn, 'loss'):
+        conn.execute('ALTER TABLE loss ADD COLUMN last_id INTEGER')
+
+
+def add_reception_epoch(conn):
+    # After a transmitter reset the same seqs come round again; the receiver's reset count
+    # (SeqWindow.resets) becomes part of the key so they are stored, not ignored.
+    # Receipts already stored were the first ones, so they belong to epoch 0.
+    if 'epoch' in table_columns(conn, 'receptions'):
+        return
+    conn.execute('DROP INDEX IF EXISTS idx_receptions_device')
+    conn.execute('ALTER TABLE receptions RENAME TO receptions_old')
+    conn.execute('''CREATE TABLE receptions (
+                        seq INTEGER NOT NULL,
+                        epoch INTEGER NOT NULL DEFAULT 0,
+                        device_id TEXT NOT NULL,
+                        rssi INTEGER,
+                        received_at DATETIME NOT NULL,
+                        PRIMARY KEY (seq, epoch, device_id)) WITHOUT ROWID''')
+    conn.execute('CREATE INDEX idx_receptions_device ON receptions (device_id, epoch, seq)')
+    conn.execute('''INSERT INTO receptions (seq, epoch, device_id, rssi, received_at)
+                    SELECT seq, 0, device_id, rssi, received_at FROM receptions_old''')
+    conn.execute('DROP TABLE receptions_old')
+
+
+def create_reception_epochs(conn):
+    # A receiver's reset count is its own: one that came online after a reset counts from 0.
+    # This maps each (receiver, reset count) to an epoch of the transmitter that every
+    # receiver shares, and receptions.epoch now holds that. Epochs stored so far map to themselves.
+    conn.execute('''CREATE TABLE IF NOT EXISTS reception_epochs (
+                        device_id TEXT NOT NULL,
+                        resets INTEGER NOT NULL,
+                        epoch INTEGER NOT NULL,
+                        started_at DATETIME NOT NULL,
+                        PRIMARY KEY (device_id, resets)) WITHOUT ROWID''')
+    conn.execute('''INSERT OR IGNORE INTO reception_epochs (device_id, resets, epoch, started_at)
+                    SELECT device_id, epoch, epoch, MIN(received_at) FROM receptions GROUP BY device_id, epoch''')
+
+
+def add_rollup_received(conn):
+    # Packets counted duplicates too, so loss computed from them came out low. Buckets
+    # already stored can't tell, so they count every packet as received.
+    for table, _, _ in rollups.ROLLUPS.values():
+        if 'received' not in table_columns(conn, table):
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN received INTEGER NOT NULL DEFAULT 0')
+            conn.execute(f'UPDATE {table} SET received = packets')
+
+# Append only: the position in this list is the schema version it upgrades to
+MIGRATIONS = [
+    create_base_tables,
+    add_device_state_columns,
+    create_receptions,
+    add_rssi_column,
+    create_data_indexes,
+    add_seq_window_columns,
+    create_device_time_index,
+    create_rollup_tables,
+    create_device_summary,
+    create_server_meta,
+    partition_data_table,
+    add_loss_last_id,
+    add_reception_epoch,
+    create_reception_epochs,
+    add_rollup_received,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Apply every migration newer than the database's PRAGMA user_version"""
+    applied = []
+    while True:
+        # The write lock makes concurrent workers wait instead of migrating twice
+        conn.execute('BEGIN IMMEDIATE')
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            conn.rollback()
+            return applied
+        migration = MIGRATIONS[version]
+        try:
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {version + 1}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(migration.__name__)
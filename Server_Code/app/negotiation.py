@@ -0,0 +1,48 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Response bodies are compressed per request, so favour speed over the last few percent
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+
+
+def accepted_encodings(accept_encoding):
+    """Codings from an Accept-Encoding header, minus any refused with q=0"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        quality = params.strip().lower()
+        try:
+            refused = quality.startswith('q=') and float(quality[2:]) == 0
+        except ValueError:
+            refused = False
+        if coding and not refused:
+            accepted.add(coding)
+    return accepted
+
+
+def etag_matches(if_none_match, etag):
+    # Weak comparison, as If-None-Match calls for
+    etag = etag[2:] if etag.startswith('W/') else etag
+    for candidate in (if_none_match or '').split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate in ('*', etag):
+            return True
+    return False
+
+
+def compress(body, accept_encoding):
+    """(encoding, body) in the best coding the client accepts; encoding is None if it takes neither"""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return 'br', brotli.compress(body, quality=BROTLI_QUALITY)
+    if 'gzip' in accepted:
+        return 'gzip', gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return None, body
@@ -0,0 +1,43 @@
+import struct
+
+# Compact fixed-layout packet, little-endian, 18 bytes:
+#   magic     2s  b'SW' (skywalker team tag, replaces the "message" field)
+#   version   B   PACKET_VERSION
+#   flags     B   reserved, send 0
+#   device_id 8s  ASCII, NUL padded
+#   seq       I   transmitter sequence number
+#   rssi      h   RSSI in dBm
+# A batch upload is several packets back to back.
+BINARY_MIMETYPE = 'application/octet-stream'
+PACKET_MAGIC = b'SW'
+PACKET_VERSION = 1
+PACKET_STRUCT = struct.Struct('<2sBB8sIh')
+TEAM_MESSAGE = 'skywalker'
+
+
+def encode_packet(device_id, seq, rssi):
+    return PACKET_STRUCT.pack(PACKET_MAGIC, PACKET_VERSION, 0, device_id.encode('ascii'), seq, rssi)
+
+
+def decode_packets(body, device_id):
+    """
+    Decode one or more binary packets into the same dicts the JSON route receives.
+    Raises ValueError for malformed bodies or a device id that doesn't match the URL.
+    """
+    if not body or len(body) % PACKET_STRUCT.size:
+        raise ValueError(f"Binary body must be a multiple of {PACKET_STRUCT.size} bytes")
+
+    records = []
+    for magic, version, _flags, raw_device_id, seq, rssi in PACKET_STRUCT.iter_unpack(body):
+        if version != PACKET_VERSION:
+            raise ValueError(f"Unsupported packet version {version}")
+        packet_device_id = raw_device_id.rstrip(b'\0').decode('ascii', errors='replace')
+        if packet_device_id != device_id:
+            raise ValueError(f"Packet device id {packet_device_id} does not match {device_id}")
+        records.append({
+            # A wrong magic fails the usual transmitter check in the route
+            'message': TEAM_MESSAGE if magic == PACKET_MAGIC else '',
+            'seq': seq,
+            'rssi': rssi
+        })
+    return records
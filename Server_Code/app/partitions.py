@@ -0,0 +1,219 @@
+"""
+Packet rows are stored in one table per day.
+
+Ingest always inserts into data_current, so the SQL never changes and ids
+keep counting up across partitions. At the first rollover after midnight
+data_current is renamed to data_YYYYMMDD (the day it was opened) and a new
+data_current continues the id sequence. Partitions therefore cover disjoint,
+increasing id ranges, and retention or a clear drops whole tables instead of
+deleting rows.
+
+data_partitions lists the partitions in creation order. A data view
+(UNION ALL of every partition, inserts go to data_current) keeps ad-hoc SQL
+working. The server reads through select() because SQLite can't always
+push ORDER BY ... LIMIT into a compound view.
+"""
+import heapq
+from datetime import datetime
+
+CURRENT = 'data_current'
+VIEW = 'data'
+COLUMNS = ('id', 'device_id', 'seq', 'packet_loss', 'data', 'timestamp', 'rssi')
+
+INDEXES = (
+    ('device_id', 'device_id, id'),
+    ('timestamp', 'timestamp'),
+    ('device_seq', 'device_id, seq'),
+    ('device_timestamp', 'device_id, timestamp'),
+)
+
+
+def day(timestamp=None):
+    """Partition day (YYYYMMDD) of an ISO timestamp, or of now"""
+    if timestamp is None:
+        return datetime.now().strftime('%Y%m%d')
+    return timestamp[:10].replace('-', '')
+
+
+def create_catalog(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS data_partitions (
+                        number INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE,
+                        day TEXT NOT NULL)''')
+
+
+def names(conn):
+    """Partition tables, oldest (lowest ids) first; data_current is always last"""
+    return [name for (name,) in conn.execute("SELECT name FROM data_partitions ORDER BY number")]
+
+
+def current_day(conn):
+    row = conn.execute("SELECT day FROM data_partitions WHERE name = ?", (CURRENT,)).fetchone()
+    return row[0] if row else None
+
+
+def last_id(conn):
+    # AUTOINCREMENT keeps the newest id here, and the row follows data_current through renames
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (CURRENT,)).fetchone()
+    return row[0] if row else 0
+
+
+def create_current(conn, partition_day, start_id=0):
+    """A new, empty data_current whose ids continue after start_id"""
+    conn.execute(f'''CREATE TABLE {CURRENT} (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        device_id TEXT NOT NULL,
+                        seq INTEGER NOT NULL,
+                        packet_loss INTEGER DEFAULT 0,
+                        data TEXT NOT NULL,
+                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        rssi INTEGER)''')
+    # Named for the day rather than the table, so they stay unique after the rename
+    for suffix, columns in INDEXES:
+        conn.execute(f'CREATE INDEX idx_data_{partition_day}_{suffix} ON {CURRENT} ({columns})')
+    if start_id:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (CURRENT, start_id))
+    conn.execute("INSERT INTO data_partitions (name, day) VALUES (?, ?)", (CURRENT, partition_day))
+
+
+def rebuild_view(conn):
+    # Dropping the view drops its insert trigger too
+    conn.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    select_list = ', '.join(COLUMNS)
+    conn.execute(f"CREATE VIEW {VIEW} AS " + " UNION ALL ".join(
+        f"SELECT {select_list} FROM {name}" for name in names(conn)))
+    conn.execute(f'''CREATE TRIGGER {VIEW}_insert INSTEAD OF INSERT ON {VIEW} BEGIN
+                         INSERT INTO {CURRENT} (device_id, seq, packet_loss, data, timestamp, rssi)
+                         VALUES (NEW.device_id, NEW.seq, COALESCE(NEW.packet_loss, 0), NEW.data,
+                                 COALESCE(NEW.timestamp, CURRENT_TIMESTAMP), NEW.rssi);
+                     END''')
+
+
+def partition_table(conn):
+    """Turn the single data table into the first partition (schema migration)"""
+    create_catalog(conn)
+    conn.execute(f"ALTER TABLE {VIEW} RENAME TO {CURRENT}")
+    conn.execute("INSERT INTO data_partitions (name, day) VALUES (?, ?)", (CURRENT, day()))
+    rebuild_view(conn)
+
+
+def _write(conn):
+    # Python's sqlite3 doesn't open a transaction for DDL by itself; the write lock also
+    # makes a second worker wait and then see the first one's change instead of repeating it
+    if not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+
+
+def rollover(conn, today=None):
+    """Close data_current as data_<day it was opened> once the day has changed; True if it did"""
+    today = today or day()
+    _write(conn)
+    opened = current_day(conn)
+    # Days only move forward, which also keeps partition and index names unique
+    if opened is None or opened >= today:
+        return False
+    closed = f'data_{opened}'
+    conn.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    conn.execute(f"ALTER TABLE {CURRENT} RENAME TO {closed}")
+    conn.execute("UPDATE data_partitions SET name = ? WHERE name = ?", (closed, CURRENT))
+    # The sqlite_sequence row moved with the rename, so the new table continues from it
+    start_id = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (closed,)).fetchone()
+    create_current(conn, today, start_id[0] if start_id else 0)
+    rebuild_view(conn)
+    return True
+
+
+def drop(conn, name):
+    # Call rebuild_view() afterwards
+    _write(conn)
+    conn.execute(f"DROP TABLE {name}")
+    conn.execute("DELETE FROM data_partitions WHERE name = ?", (name,))
+
+
+def clear(conn):
+    """Drop every partition and start an empty data_current; ids keep counting up"""
+    _write(conn)
+    start_id = last_id(conn)
+    conn.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    for name in names(conn):
+        drop(conn, name)
+    create_current(conn, day(), start_id)
+    rebuild_view(conn)
+
+
+def newest_timestamp(conn, name):
+    return conn.execute(f"SELECT MAX(timestamp) FROM {name}").fetchone()[0]
+
+
+def snapshot(conn):
+    """
+    Start a read transaction and return the partitions in it. Every read in the same
+    db.connection() block then sees the same partitions, however long the walk takes.
+    """
+    if not conn.in_transaction:
+        conn.execute('BEGIN')
+    return names(conn)
+
+
+def select(conn, columns, where=None, params=(), limit=None, newest_first=False):
+    """
+    Rows from every partition in id order (newest first if asked), up to limit.
+    Partitions hold disjoint id ranges, so they are read one after another until limit is met.
+    """
+    partitions = snapshot(conn)
+    if newest_first:
+        partitions.reverse()
+    sql = f"SELECT {', '.join(columns)} FROM {{table}}"
+    if where:
+        sql += f" WHERE {where}"
+    sql += f" ORDER BY id {'DESC' if newest_first else 'ASC'}"
+    if limit is not None:
+        sql += " LIMIT ?"
+
+    rows = []
+    for name in partitions:
+        wanted = () if limit is None else (limit - len(rows),)
+        rows.extend(conn.execute(sql.format(table=name), tuple(params) + wanted).fetchall())
+        if limit is not None and len(rows) >= limit:
+            break
+    return rows
+
+
+def select_by_time(conn, columns, where=None, params=(), limit=None):
+    """
+    Rows from every partition ordered by (timestamp, id), up to limit; columns must include both.
+    Rows near midnight can land in either neighbouring partition, so results are merged,
+    but partitions that start after the last row needed are never read.
+    """
+    time_index = columns.index('timestamp')
+    id_index = columns.index('id')
+    sql = f"SELECT {', '.join(columns)} FROM {{table}}"
+    if where:
+        sql += f" WHERE {where}"
+    sql += " ORDER BY timestamp, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+
+    def sort_key(row):
+        return row[time_index] or '', row[id_index]
+
+    rows = []
+    for name in snapshot(conn):
+        if limit is not None and len(rows) >= limit:
+            earliest = conn.execute(f"SELECT MIN(timestamp) FROM {name}").fetchone()[0]
+            if earliest is None or earliest > sort_key(rows[limit - 1])[0]:
+                continue
+        found = conn.execute(sql.format(table=name), tuple(params) + ((limit,) if limit is not None else ())).fetchall()
+        rows = list(heapq.merge(rows, found, key=sort_key))
+        if limit is not None:
+            rows = rows[:limit]
+    return rows
+
+
+def count_by_device(conn, name=None):
+    """Stored rows per device, in one partition or all of them"""
+    counts = {}
+    for table in [name] if name else snapshot(conn):
+        for device_id, count in conn.execute(f"SELECT device_id, COUNT(*) FROM {table} GROUP BY device_id"):
+            counts[device_id] = counts.get(device_id, 0) + count
+    return counts
@@ -0,0 +1,284 @@
+"""
+Recompute the stored packet_loss column and the loss table from the packet history.
+
+    python recompute_loss.py [--database PATH] [--archive DIR] [--chunk-rows N] [--window-size N]
+
+Every packet is replayed through the same sequence window rules as
+device_state.SeqWindow, in id order, but a chunk of rows at a time with
+array operations instead of one add() per packet. Changed packet_loss
+values are written back one transaction per chunk (archived days get a new
+packet_loss.npy), then the loss table and the device summaries are rebuilt
+from the final windows.
+
+Stop the server first: a running one would write its own device state back
+over the rebuilt loss table.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+import db
+import migrations
+import partitions
+from archive import ColumnArchive
+from device_state import DEFAULT_WINDOW_SIZE, UPSERT_SQL, SeqWindow, jumped_back
+
+# Rows read, replayed and written per transaction
+CHUNK_ROWS = 50000
+# Rows scanned at once when looking for the next transmitter reset, so frequent resets stay cheap
+SCAN_ROWS = 65536
+
+
+class DeviceReplay:
+    """One device's SeqWindow, advanced by whole arrays of seqs"""
+
+    def __init__(self, size):
+        self.size = size
+        self.highest = None
+        # First seq of the current epoch, and the counts when it started
+        self.first = None
+        self.lost_base = 0
+        self.received_base = 0
+        # Seqs received in the current epoch that are still inside the window
+        self.window = np.empty(0, dtype=np.int64)
+        self.lost = 0
+        self.seen = 0
+        self.received = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.resets = 0
+
+    def replay(self, seqs):
+        """Lost and received counts after each packet of seqs (in arrival order)"""
+        count = len(seqs)
+        lost = np.empty(count, dtype=np.int64)
+        received = np.empty(count, dtype=np.int64)
+        start = 0
+        while start < count:
+            if self.highest is None:
+                self._start_epoch(int(seqs[start]))
+                lost[start], received[start] = self.lost, self.received
+                start += 1
+                continue
+            block = seqs[start:start + SCAN_ROWS]
+            # The highest seq before each packet, exact up to the first reset in the block
+            before = np.maximum.accumulate(np.concatenate(([self.highest], block[:-1])))
+            offsets = before - block
+            # seq 1 within the window restarts the epoch if 1 counts as seen: below the first seq,
+            # or already received
+            ones = block == 1
+            if self.first < 1 and not np.isin(1, self.window):
+                ones &= np.cumsum(ones) > 1
+            resets = np.flatnonzero(jumped_back(block, offsets, self.size) | (ones & (offsets > 0)))
+            end = int(resets[0]) if len(resets) else len(block)
+            self._advance(block[:end], before[:end], lost[start:start + end], received[start:start + end])
+            start += end
+            if end < len(block):
+                self.resets += 1
+                self._start_epoch(int(seqs[start]))
+                lost[start], received[start] = self.lost, self.received
+                start += 1
+        return lost, received
+
+    def _start_epoch(self, seq):
+        # As SeqWindow._start_epoch: the seqs just below the first one count as already seen
+        self.seen += 1
+        self.received += 1
+        self.highest = self.first = seq
+        self.lost_base = self.lost
+        self.received_base = self.received - 1
+        self.window = np.array([seq], dtype=np.int64)
+
+    def _advance(self, seqs, before, lost_out, received_out):
+        if len(seqs) == 0:
+            return
+        # A seq is new the first time it shows up in the epoch; earlier ones in the window,
+        # and any below the epoch's first seq, are duplicates
+        _, first_index = np.unique(seqs, return_index=True)
+        fresh = np.zeros(len(seqs), dtype=bool)
+        fresh[first_index] = True
+        fresh &= (seqs >= self.first) & ~np.isin(seqs, self.window)
+
+        highest = np.maximum(before, seqs)
+        received_out[:] = self.received + np.cumsum(fresh)
+        # Everything from the first seq up to the highest one that hasn't arrived is lost
+        lost_out[:] = self.lost_base + (highest - self.first + 1) - (received_out - self.received_base)
+
+        self.seen += len(seqs)
+        new = int(np.count_nonzero(fresh))
+        self.duplicates += len(seqs) - new
+        self.reordered += int(np.count_nonzero(fresh & (seqs < before)))
+        self.received = int(received_out[-1])
+        self.lost = int(lost_out[-1])
+        self.highest = int(highest[-1])
+        window = np.union1d(self.window, seqs[fresh])
+        self.window = window[window > self.highest - self.size]
+
+    def state(self):
+        """The equivalent SeqWindow, for the loss table"""
+        state = SeqWindow(self.size)
+        state.highest = self.highest
+        state.lost = self.lost
+        state.seen = self.seen
+        state.received = self.received
+        state.duplicates = self.duplicates
+        state.reordered = self.reordered
+        state.resets = self.resets
+        bitmap = 0
+        for seq in self.window.tolist():
+            bitmap |= 1 << (self.highest - seq)
+        # Bits below the epoch's first seq were set when it started and are still in the window
+        start = self.highest - self.first + 1
+        if start < self.size:
+            bitmap |= state.mask >> start << start
+        state.bitmap = bitmap & state.mask
+        return state
+
+
+class LossReplay:
+    """Every device's replay, fed chunks of (device_id, seq) in id order"""
+
+    def __init__(self, window_size=DEFAULT_WINDOW_SIZE):
+        self.window_size = window_size
+        self.devices = {}
+
+    def packet_loss(self, device_ids, seqs):
+        """packet_loss after each packet, as SeqWindow.packet_loss would have stored it"""
+        codes = {}
+        device_codes = np.array([codes.setdefault(device_id, len(codes)) for device_id in device_ids], dtype=np.int64)
+        lost = np.empty(len(seqs), dtype=np.int64)
+        received = np.empty(len(seqs), dtype=np.int64)
+        # Group by device, keeping arrival order within each
+        order = np.argsort(device_codes, kind='stable')
+        ends = np.cumsum(np.bincount(device_codes, minlength=len(codes))).tolist()
+        start = 0
+        for device_id, end in zip(codes, ends):
+            device = self.devices.get(device_id)
+            if device is None:
+                device = self.devices[device_id] = DeviceReplay(self.window_size)
+            rows = order[start:end]
+            lost[rows], received[rows] = device.replay(seqs[rows])
+            start = end
+        expected = received + lost
+        exact = lost / np.maximum(expected, 1) * 100
+        percent = np.round(exact, 2)
+        # np.round scales by 100 first, which can tip values right at a half the other way
+        # from Python's round(); redo those few the way the server does
+        scaled = exact * 100
+        for index in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6).tolist():
+            percent[index] = round(float(exact[index]), 2)
+        return np.where(expected > 0, percent, 0)
+
+
+def replay_archive(column_archive, replay, chunk_rows):
+    """Recompute archived days; returns (rows, changed rows)"""
+    total = changed = 0
+    for segment in column_archive.segments():
+        started = time.perf_counter()
+        old_loss = np.asarray(segment['packet_loss'])
+        new_loss = np.empty(len(segment), dtype=np.float64)
+        for start in range(0, len(segment), chunk_rows):
+            end = start + chunk_rows
+            device_ids = [segment.devices[code] for code in segment['device'][start:end].tolist()]
+            new_loss[start:end] = replay.packet_loss(device_ids, np.asarray(segment['seq'][start:end], dtype=np.int64))
+        segment_changed = int(np.count_nonzero(new_loss != old_loss))
+        if segment_changed:
+            # Replaced whole, so a reader has either the old file or the new one
+            path = os.path.join(segment.path, 'packet_loss.npy')
+            temp_path = os.path.join(segment.path, '.packet_loss.npy')
+            np.save(temp_path, new_loss)
+            os.replace(temp_path, path)
+        report(segment.name, len(segment), segment_changed, started)
+        total += len(segment)
+        changed += segment_changed
+    return total, changed
+
+
+def replay_partitions(conn, replay, chunk_rows):
+    """Recompute the live partitions; returns (rows, changed rows)"""
+    total = changed = 0
+    for name in partitions.names(conn):
+        started = time.perf_counter()
+        rows = partition_changed = 0
+        last_id = 0
+        while True:
+            chunk = conn.execute(f"SELECT id, device_id, seq, packet_loss FROM {name} WHERE id > ? ORDER BY id LIMIT ?",
+                                 (last_id, chunk_rows)).fetchall()
+            if not chunk:
+                break
+            row_ids, device_ids, seqs, stored = zip(*chunk)
+            new_loss = replay.packet_loss(device_ids, np.array(seqs, dtype=np.int64))
+            old_loss = np.array([loss or 0 for loss in stored], dtype=np.float64)
+            updates = np.flatnonzero(new_loss != old_loss).tolist()
+            if updates:
+                # One transaction per chunk keeps the lock short and the journal bounded
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(f"UPDATE {name} SET packet_loss = ? WHERE id = ?",
+                                 ((new_loss[index].item(), row_ids[index]) for index in updates))
+                conn.commit()
+            rows += len(chunk)
+            partition_changed += len(updates)
+            last_id = row_ids[-1]
+        report(name, rows, partition_changed, started)
+        total += rows
+        changed += partition_changed
+    return total, changed
+
+
+def rebuild_loss_table(conn, replay):
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute("DELETE FROM loss")
+    for device_id, device in replay.devices.items():
+        state = device.state()
+        conn.execute(UPSERT_SQL, (device_id,) + state.to_row() + (None,))
+        conn.execute("UPDATE device_summary SET packet_loss = ? WHERE device_id = ?", (state.packet_loss, device_id))
+    # Cached reads served the old values
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'clear_generation'")
+    conn.commit()
+
+
+def report(name, rows, changed, started):
+    elapsed = time.perf_counter() - started
+    print(f"{name}: {rows} rows, {changed} changed, {elapsed:.1f} s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def main():
+    default_database = os.path.join(
+        os.environ.get('IOT_DB_DIRECTORY', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_store')),
+        os.environ.get('IOT_DB_FILENAME', 'device_data.db'))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database', default=default_database, help='SQLite file (default: %(default)s)')
+    parser.add_argument('--archive', default=os.environ.get('IOT_ARCHIVE_DIRECTORY'),
+                        help='column archive directory (default: next to the database)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='rows per transaction (default: %(default)s)')
+    parser.add_argument('--window-size', type=int, default=int(os.environ.get('IOT_SEQ_WINDOW_SIZE', DEFAULT_WINDOW_SIZE)),
+                        help='sequence window of the server (default: %(default)s)')
+    args = parser.parse_args()
+    if not os.path.exists(args.database):
+        parser.error(f"no database at {args.database}")
+
+    started = time.perf_counter()
+    replay = LossReplay(args.window_size)
+    conn = db.connect(args.database)
+    try:
+        # A database last opened by an older server has no partitions or seq window columns yet
+        applied = migrations.migrate(conn)
+        if applied:
+            print(f"Applied database migrations: {', '.join(applied)}")
+        # Archived days hold the lowest ids, so they are replayed first
+        column_archive = ColumnArchive(args.archive or os.path.splitext(args.database)[0] + '_archive')
+        archived, archived_changed = replay_archive(column_archive, replay, args.chunk_rows)
+        live, live_changed = replay_partitions(conn, replay, args.chunk_rows)
+        rebuild_loss_table(conn, replay)
+    finally:
+        conn.close()
+    rows = archived + live
+    elapsed = time.perf_counter() - started
+    print(f"Recomputed {rows} rows ({archived_changed + live_changed} changed) for {len(replay.devices)} devices "
+          f"in {elapsed:.1f} s, {rows / max(elapsed, 1e-9):,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
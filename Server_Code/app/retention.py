@@ -0,0 +1,178 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+import archive
+import db
+import partitions
+import rollups
+
+
+def _forget_rows(conn, counts, cutoff):
+    # Expired rows leave the device packet counts and the minute rollups; hour and day rollups
+    # are small and kept for good
+    for device_id, count in counts.items():
+        conn.execute("UPDATE device_summary SET packets = max(packets - ?, 0) WHERE device_id = ?", (count, device_id))
+    conn.execute(f"DELETE FROM {rollups.ROLLUPS['1m'][0]} WHERE bucket < ?", (rollups.bucket(cutoff, '1m'),))
+
+
+def _drop_partition(conn, name):
+    partitions.drop(conn, name)
+    partitions.rebuild_view(conn)
+    # Cached reads must not survive the rows they were built from
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'clear_generation'")
+
+
+def _closed_partition(conn, name):
+    conn.execute('BEGIN IMMEDIATE')
+    # Another worker may have got here first
+    return name != partitions.CURRENT and name in partitions.names(conn)
+
+
+def expire(conn, name, cutoff):
+    """
+    Drop a closed partition if its newest row is older than cutoff, with what was derived from it:
+    its share of the device packet counts, its receptions and the minute rollups. Returns True if dropped.
+    """
+    if not _closed_partition(conn, name):
+        return False
+    newest = partitions.newest_timestamp(conn, name)
+    if newest is not None and newest >= cutoff:
+        return False
+    _forget_rows(conn, partitions.count_by_device(conn, name), cutoff)
+    if newest is not None:
+        # receptions keeps the first receipt, so only ones no later than this partition came from it
+        conn.execute(f"""DELETE FROM receptions WHERE (seq, device_id) IN (SELECT seq, device_id FROM {name})
+                         AND received_at <= ?""", (newest,))
+    _drop_partition(conn, name)
+    return True
+
+
+def move_to_archive(database_path, column_archive, name):
+    """Copy a closed partition into the archive, then drop it from the database; returns True if moved"""
+    with db.connection(database_path) as conn:
+        column_archive.write(conn, name)
+    with db.connection(database_path) as conn:
+        if not _closed_partition(conn, name):
+            return False
+        # The rows stay in the device packet counts and receptions; they are still stored, only elsewhere
+        _drop_partition(conn, name)
+    return True
+
+
+def expire_archive(database_path, column_archive, cutoff):
+    """Delete archived partitions whose newest row is older than cutoff; returns their names"""
+    cutoff_micros = int(archive.to_micros([cutoff])[0])
+    expired = []
+    for segment in column_archive.segments():
+        if segment.meta['max_time'] is not None and segment.meta['max_time'] >= cutoff_micros:
+            break
+        with db.connection(database_path) as conn:
+            # The write lock keeps two workers from both taking the rows off the counts
+            conn.execute('BEGIN IMMEDIATE')
+            if not os.path.exists(segment.path):
+                continue
+            _forget_rows(conn, segment.counts_by_device(), cutoff)
+            if segment.meta['max_time'] is not None:
+                # Days expire in order, so every receipt up to the segment's newest row came from it or earlier
+                newest = archive.EPOCH + timedelta(microseconds=segment.meta['max_time'])
+                conn.execute("DELETE FROM receptions WHERE received_at <= ?", (newest.isoformat(),))
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'clear_generation'")
+            column_archive.remove(segment)
+        expired.append(segment.name)
+    return expired
+
+
+class RetentionTask:
+    """
+    Background partition upkeep.
+
+    Every interval_s (and just after midnight) it rolls data_current over to
+    a new day, drops closed partitions whose newest row is older than
+    retention_days (0 keeps everything), moves those older than
+    archive_after_days into the column archive (0 never does) and expires
+    archived days like live ones. Then it returns up to vacuum_pages free
+    pages to the filesystem (0 means all of them) when the database uses
+    incremental auto-vacuum.
+    """
+
+    def __init__(self, retention_days=0, interval_s=300, vacuum_pages=0, column_archive=None, archive_after_days=0):
+        self.retention_days = retention_days
+        self.interval = interval_s
+        self.vacuum_pages = vacuum_pages
+        self.column_archive = column_archive
+        self.archive_after_days = archive_after_days if column_archive is not None else 0
+        self.database_path = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def run_once(self):
+        """One maintenance pass; returns the partitions it dropped and the ones it archived"""
+        database_path = self.database_path
+        with db.connection(database_path) as conn:
+            partitions.rollover(conn)
+            closed = partitions.names(conn)[:-1]
+
+        now = datetime.now()
+        cutoff = (now - timedelta(days=self.retention_days)).isoformat() if self.retention_days > 0 else None
+        archive_cutoff = (now - timedelta(days=self.archive_after_days)).isoformat() if self.archive_after_days > 0 else None
+        dropped = []
+        archived = []
+        # Oldest first; rows age in id order, so the first partition that is still live ends the pass
+        for name in closed:
+            with db.connection(database_path) as conn:
+                newest = partitions.newest_timestamp(conn, name)
+            if cutoff is not None and (newest is None or newest < cutoff):
+                with db.connection(database_path) as conn:
+                    if not expire(conn, name, cutoff):
+                        break
+                dropped.append(name)
+            elif archive_cutoff is not None and (newest is None or newest < archive_cutoff):
+                if not move_to_archive(database_path, self.column_archive, name):
+                    break
+                archived.append(name)
+            else:
+                break
+        if cutoff is not None and self.column_archive is not None:
+            dropped += expire_archive(database_path, self.column_archive, cutoff)
+
+        with db.connection(database_path) as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                conn.execute(f'PRAGMA incremental_vacuum({self.vacuum_pages})').fetchall()
+        return dropped, archived
+
+    def start(self, database_path=None):
+        if database_path is not None:
+            self.database_path = database_path
+        # A forked worker inherits the attribute but not the thread itself
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name='partition-retention', daemon=True)
+                    self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _next_wait(self):
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return min(self.interval, (midnight - now).total_seconds() + 1)
+
+    def _run(self):
+        while True:
+            try:
+                dropped, archived = self.run_once()
+                if dropped:
+                    print(f"Dropped expired partitions: {', '.join(dropped)}")
+                if archived:
+                    print(f"Archived partitions: {', '.join(archived)}")
+            except Exception as exc:
+                print(f"Partition maintenance failed: {exc}")
+            if self._stop.wait(self._next_wait()):
+                return
@@ -0,0 +1,124 @@
+# Per-device aggregates at each resolution: table name, and how a stored ISO timestamp
+# becomes the start of its bucket (keep this many characters, then pad to minutes)
+ROLLUPS = {
+    '1m': ('rollup_1m', 16, ''),
+    '1h': ('rollup_1h', 13, ':00'),
+    '1d': ('rollup_1d', 10, 'T00:00'),
+}
+
+ROLLUP_COLUMNS = ('device_id', 'bucket', 'packets', 'received', 'lost', 'rssi_count', 'rssi_sum', 'rssi_min', 'rssi_max')
+
+# Counters add up; min/max keep whichever side isn't NULL when only one has RSSI readings
+UPSERT_SQL = {
+    resolution: f"""INSERT INTO {table} ({', '.join(ROLLUP_COLUMNS)}) VALUES ({', '.join('?' for _ in ROLLUP_COLUMNS)})
+                    ON CONFLICT(device_id, bucket) DO UPDATE SET
+                        packets = packets + excluded.packets,
+                        received = received + excluded.received,
+                        lost = lost + excluded.lost,
+                        rssi_count = rssi_count + excluded.rssi_count,
+                        rssi_sum = rssi_sum + excluded.rssi_sum,
+                        rssi_min = min(COALESCE(rssi_min, excluded.rssi_min), COALESCE(excluded.rssi_min, rssi_min)),
+                        rssi_max = max(COALESCE(rssi_max, excluded.rssi_max), COALESCE(excluded.rssi_max, rssi_max))"""
+    for resolution, (table, _, _) in ROLLUPS.items()
+}
+
+
+def bucket(timestamp, resolution):
+    _, length, padding = ROLLUPS[resolution]
+    return timestamp[:length] + padding
+
+
+def bucket_sql(column, resolution):
+    # The same cut in SQL; legacy CURRENT_TIMESTAMP values use a space instead of the T
+    _, length, padding = ROLLUPS[resolution]
+    return f"replace(substr({column}, 1, {length}), ' ', 'T') || '{padding}'"
+
+
+def create_tables(conn):
+    for table, _, _ in ROLLUPS.values():
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+                            device_id TEXT NOT NULL,
+                            bucket TEXT NOT NULL,
+                            packets INTEGER NOT NULL DEFAULT 0,
+                            received INTEGER NOT NULL DEFAULT 0,
+                            lost INTEGER NOT NULL DEFAULT 0,
+                            rssi_count INTEGER NOT NULL DEFAULT 0,
+                            rssi_sum INTEGER NOT NULL DEFAULT 0,
+                            rssi_min INTEGER,
+                            rssi_max INTEGER,
+                            PRIMARY KEY (device_id, bucket)) WITHOUT ROWID''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table} (bucket)')
+
+
+def rollup_statements(device_id, timestamp, packets):
+    """
+    (sql, row) upserts adding packets to every resolution.
+    packets is a list of (rssi, received, lost): how much the packet changed the device's received
+    count (0 for a duplicate) and its lost count.
+    """
+    rssi_values = [rssi for rssi, _, _ in packets if rssi is not None]
+    totals = (
+        len(packets),
+        sum(received for _, received, _ in packets),
+        sum(lost for _, _, lost in packets),
+        len(rssi_values),
+        sum(rssi_values),
+        min(rssi_values) if rssi_values else None,
+        max(rssi_values) if rssi_values else None
+    )
+    return [(UPSERT_SQL[resolution], (device_id, bucket(timestamp, resolution)) + totals)
+            for resolution in ROLLUPS]
+
+
+def backfill(conn):
+    # History from before the rollups existed. Only packet and RSSI figures can be
+    # rebuilt from stored rows; per-packet loss deltas weren't kept, so lost starts at 0
+    # and every stored row counts as received.
+    for resolution, (table, _, _) in ROLLUPS.items():
+        conn.execute(f"""INSERT INTO {table} ({', '.join(ROLLUP_COLUMNS)})
+                         SELECT device_id, {bucket_sql('timestamp', resolution)}, COUNT(*), COUNT(*), 0,
+                                COUNT(rssi), COALESCE(SUM(rssi), 0), MIN(rssi), MAX(rssi)
+                         FROM data WHERE timestamp IS NOT NULL GROUP BY 1, 2 ORDER BY 1, 2""")
+
+
+def query(conn, resolution, device_id=None, since=None, until=None, limit=None):
+    """Buckets in time order, as one array per column; since/until are ISO times, since inclusive"""
+    table = ROLLUPS[resolution][0]
+    conditions = []
+    params = []
+    for clause, value in (("device_id = ?", device_id),
+                          ("bucket >= ?", bucket(since, resolution) if since else None),
+                          ("bucket < ?", bucket(until, resolution) if until else None)):
+        if value is not None:
+            conditions.append(clause)
+            params.append(value)
+    sql = f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY bucket, device_id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    records = conn.execute(sql, params).fetchall()
+
+    truncated = limit is not None and len(records) > limit
+    if limit is not None:
+        records = records[:limit]
+    columns = {
+        'device_id': [], 'bucket': [], 'packets': [], 'received': [], 'lost': [],
+        'packet_loss': [], 'rssi_min': [], 'rssi_avg': [], 'rssi_max': []
+    }
+    for device_id, bucket_start, packets, received, lost, rssi_count, rssi_sum, rssi_min, rssi_max in records:
+        columns['device_id'].append(device_id)
+        columns['bucket'].append(bucket_start)
+        columns['packets'].append(packets)
+        columns['received'].append(received)
+        columns['lost'].append(lost)
+        # Same definition as the live figure: lost as a share of what the transmitter sent,
+        # which duplicates don't add to
+        expected = received + lost
+        columns['packet_loss'].append(round(lost / expected * 100, 2) if expected > 0 and lost > 0 else 0)
+        columns['rssi_min'].append(rssi_min)
+        columns['rssi_avg'].append(round(rssi_sum / rssi_count, 2) if rssi_count else None)
+        columns['rssi_max'].append(rssi_max)
+    return {'resolution': resolution, 'count': len(records), 'truncated': truncated, 'columns': columns}
@@ -0,0 +1,510 @@
+let isFullTableLoaded = false;
+const LIVE_ROW_LIMIT = 20;
+const DATABASE_PAGE_ROWS = 1000;
+let isDatabaseLoading = false;
+let bufferedRows = [];
+
+function formatTimestamp(timestamp) {
+    if (!timestamp) {
+        return '--:--:--';
+    }
+    const parsed = new Date(timestamp);
+    if (!Number.isNaN(parsed.getTime())) {
+        return parsed.toLocaleTimeString('en-US', {
+            hour12: false,
+            hour: '2-digit',
+            minute: '2-digit',
+            second: '2-digit'
+        });
+    }
+    if (typeof timestamp === 'string' && timestamp.includes('T')) {
+        return timestamp.split('T')[1].split('.')[0];
+    }
+    return timestamp;
+}
+
+function buildReceiverLabel(deviceId) {
+    if (!deviceId) {
+        return 'Receiver --';
+    }
+    const numericPart = deviceId.replace(/[^0-9]/g, '');
+    return `Receiver ${numericPart || '--'}`;
+}
+
+function createTableRow(rowData) {
+    const tr = document.createElement('tr');
+    const cells = [
+        { className: 'device-id-col', value: rowData.device_id || '--' },
+        { className: 'receiver-col', value: rowData.receiver_label || buildReceiverLabel(rowData.device_id) },
+        { className: 'seq-col', value: rowData.seq ?? '--' },
+        { className: 'packet-loss-col', value: rowData.packet_loss ?? '--' },
+        { className: 'rssi-col', value: rowData.rssi ?? '--' },
+        { className: 'time-col', value: rowData.time_display || formatTimestamp(rowData.timestamp) }
+    ];
+    cells.forEach(cell => {
+        const td = document.createElement('td');
+        td.className = cell.className;
+        td.textContent = cell.value !== undefined && cell.value !== null ? cell.value : '--';
+        tr.appendChild(td);
+    });
+    return tr;
+}
+
+function appendRowToTable(rowData, insertAtTop = false) {
+    const tableBody = document.getElementById('data-rows');
+    if (!tableBody) {
+        return;
+    }
+    const newRow = createTableRow(rowData);
+    if (insertAtTop && tableBody.firstChild) {
+        tableBody.insertBefore(newRow, tableBody.firstChild);
+        return;
+    }
+    tableBody.appendChild(newRow);
+}
+
+function renderTableRows(rows = []) {
+    const tableBody = document.getElementById('data-rows');
+    if (!tableBody) {
+        return;
+    }
+    tableBody.innerHTML = '';
+    appendTableRows(rows);
+}
+
+function appendTableRows(rows = []) {
+    rows.forEach(row => {
+        appendRowToTable({
+            device_id: row.device_id,
+            seq: row.seq,
+            packet_loss: row.packet_loss,
+            rssi: row.rssi ?? '--',
+            timestamp: row.timestamp
+        }, false);
+    });
+}
+
+function enforceLiveRowLimit(limit = LIVE_ROW_LIMIT) {
+    if (isFullTableLoaded) {
+        return;
+    }
+    const tableBody = document.getElementById('data-rows');
+    if (!tableBody) {
+        return;
+    }
+    while (tableBody.children.length > limit) {
+        tableBody.removeChild(tableBody.lastElementChild);
+    }
+}
+
+function flushBufferedRows() {
+    if (!bufferedRows.length) {
+        return;
+    }
+    bufferedRows.forEach(row => {
+        appendRowToTable(row, true);
+    });
+    bufferedRows = [];
+    enforceLiveRowLimit();
+}
+
+/**
+ * Filter functionality for live feed table - Task 8
+ * Requirements: 5.1, 5.2 - Real-time filtering by Device ID
+ */
+function applyFilter() {
+    const filterInput = document.getElementById('device-filter');
+    if (!filterInput) {
+        return;
+    }
+    const filterValue = filterInput.value.toLowerCase().trim();
+    const tableBody = document.getElementById('data-rows');
+    if (!tableBody) {
+        return;
+    }
+    applyFilterToRows(tableBody.getElementsByTagName('tr'), filterValue);
+}
+
+function applyFilterToRows(rows, filterValue) {
+    // Show/hide rows based on filter - Requirement 5.2
+    for (let i = 0; i < rows.length; i++) {
+        const row = rows[i];
+        const deviceIdCell = row.querySelector('.device-id-col');
+
+        if (deviceIdCell) {
+            const deviceId = deviceIdCell.textContent.toLowerCase();
+
+            // Show row if filter is empty or device ID contains filter text
+            if (filterValue === '' || deviceId.includes(filterValue)) {
+                row.style.display = '';
+            } else {
+                row.style.display = 'none';
+            }
+        }
+    }
+}
+
+async function loadDatabase() {
+    if (isDatabaseLoading) {
+        return;
+    }
+    const loadButton = document.getElementById('load-db-btn');
+    if (loadButton) {
+        loadButton.disabled = true;
+    }
+    isDatabaseLoading = true;
+    try {
+        // Page newest-first through /data/all so no single response holds the whole table
+        let cursor = null;
+        let loadedRows = 0;
+        renderTableRows([]);
+        isFullTableLoaded = true;
+        do {
+            const url = cursor === null
+                ? `/data/all?limit=${DATABASE_PAGE_ROWS}`
+                : `/data/all?limit=${DATABASE_PAGE_ROWS}&before_id=${cursor}`;
+            const response = await fetch(url);
+            if (!response.ok) {
+                throw new Error('Unable to load database.');
+            }
+            const payload = await response.json();
+            appendTableRows(payload.rows || []);
+            loadedRows += (payload.rows || []).length;
+            applyFilter();
+            if (loadButton) {
+                loadButton.textContent = `Loading… (${loadedRows} rows)`;
+            }
+            cursor = payload.next_cursor ?? null;
+        } while (cursor !== null);
+    } catch (error) {
+        console.error('Failed to load database', error);
+        alert('Unable to load database. Please check the server logs for details.');
+    } finally {
+        isDatabaseLoading = false;
+        flushBufferedRows();
+        applyFilter();
+        if (loadButton) {
+            loadButton.disabled = false;
+            loadButton.textContent = 'Load Database';
+        }
+    }
+}
+
+async function clearDatabase() {
+    const shouldClear = confirm('Clearing the database will remove all stored rows. Continue?');
+    if (!shouldClear) {
+        return;
+    }
+    const clearButton = document.getElementById('clear-db-btn');
+    if (clearButton) {
+        clearButton.disabled = true;
+    }
+    try {
+        const response = await fetch('/data/clear', { method: 'POST' });
+        if (!response.ok) {
+            throw new Error('Unable to clear database.');
+        }
+        const payload = await response.json();
+        renderTableRows([]);
+        const receiversContainer = document.getElementById('receivers-container');
+        if (receiversContainer) {
+            receiversContainer.innerHTML = '';
+        }
+        bufferedRows = [];
+        isDatabaseLoading = false;
+        isFullTableLoaded = false;
+        applyFilter();
+        alert(`Database cleared (${payload.deleted_rows || 0} rows removed).`);
+    } catch (error) {
+        console.error('Failed to clear database', error);
+        alert('Unable to clear database. Please check the server logs for details.');
+    } finally {
+        if (clearButton) {
+            clearButton.disabled = false;
+        }
+    }
+}
+
+document.addEventListener("DOMContentLoaded", function() {
+    var socket = io();
+
+    // Initialize last update timestamp on page load
+    var now = new Date();
+    var timeString = now.toLocaleTimeString('en-US', {
+        hour12: false,
+        hour: '2-digit',
+        minute: '2-digit',
+        second: '2-digit'
+    });
+    document.getElementById('last-update').textContent = timeString;
+
+    // Initialize filter functionality - Task 8 - Requirements 5.1, 5.2
+    const filterInput = document.getElementById('device-filter');
+
+    // Ask the server for only the devices matching the filter, so
+    // other devices' packets aren't sent to this browser at all
+    let subscribeTimer = null;
+    function sendSubscription() {
+        const value = filterInput ? filterInput.value.trim() : '';
+        socket.emit('subscribe', { patterns: value ? [`*${value}*`] : [] });
+    }
+    function scheduleSubscription() {
+        clearTimeout(subscribeTimer);
+        subscribeTimer = setTimeout(sendSubscription, 300);
+    }
+
+    if (filterInput) {
+        // Real-time filtering on input - Requirement 5.2
+        filterInput.addEventListener('input', function() {
+            applyFilter();
+            scheduleSubscription();
+        });
+
+        // Also filter on keyup for better responsiveness
+        filterInput.addEventListener('keyup', function() {
+            applyFilter();
+        });
+
+        // Clear filter on Escape key
+        filterInput.addEventListener('keydown', function(event) {
+            if (event.key === 'Escape') {
+                filterInput.value = '';
+                applyFilter();
+                scheduleSubscription();
+            }
+        });
+    }
+
+    const loadDbButton = document.getElementById('load-db-btn');
+    if (loadDbButton) {
+        loadDbButton.addEventListener('click', loadDatabase);
+    }
+
+    const clearDbButton = document.getElementById('clear-db-btn');
+    if (clearDbButton) {
+        clearDbButton.addEventListener('click', clearDatabase);
+    }
+
+    // WebSocket connection status
+    socket.on('connect', function() {
+        console.log('WebSocket connected');
+        // Subscriptions don't survive a reconnect
+        sendSubscription();
+    });
+
+    socket.on('disconnect', function() {
+        console.log('WebSocket disconnected');
+    });
+
+    /**
+     * Update receiver card data and trigger flash animation
+     * Requirements: 2.8, 6.1, 6.2, 6.3
+     */
+    function updateReceiverCard(deviceId, data, seq, packetLoss) {
+        // Find the receiver card for this device
+        let receiverCard = document.querySelector(`[data-device-id="${deviceId}"]`);
+
+        // If card doesn't exist, create it
+        if (!receiverCard) {
+            receiverCard = createReceiverCard(deviceId);
+        }
+
+        // Update RSSI value and color coding
+        const rssiValue = receiverCard.querySelector('.rssi-value');
+        if (rssiValue) {
+            if (data.rssi) {
+                rssiValue.textContent = data.rssi;
+
+                // Update RSSI color coding based on signal strength
+                rssiValue.removeAttribute('data-strength');
+                if (data.rssi >= -50) {
+                    rssiValue.setAttribute('data-strength', 'good');
+                } else if (data.rssi >= -70) {
+                    rssiValue.setAttribute('data-strength', 'medium');
+                } else {
+                    rssiValue.setAttribute('data-strength', 'poor');
+                }
+            } else {
+                rssiValue.textContent = '--';
+                rssiValue.removeAttribute('data-strength');
+            }
+        }
+
+        // Update sequence number
+        const sequenceNumber = receiverCard.querySelector('.sequence-number');
+        if (sequenceNumber) {
+            sequenceNumber.textContent = `Seq: ${seq}`;
+        }
+
+        // Update packet loss indicator
+        const lossPercentage = receiverCard.querySelector('.loss-percentage');
+        const progressArc = receiverCard.querySelector('.progress-arc');
+        if (lossPercentage && progressArc) {
+            // Calculate packet loss percentage (simple approximation)
+            const lossPercent = Math.min(packetLoss, 30); // Cap at 30% for display
+            lossPercentage.textContent = `${lossPercent}%`;
+            progressArc.setAttribute('data-percentage', lossPercent.toString());
+
+            // Update stroke-dashoffset for progress arc
+            const circumference = 125.66; // 2 * π * 20
+            const offset = circumference - (circumference * (lossPercent / 100));
+            progressArc.style.strokeDashoffset = offset;
+        }
+
+        // Update status badge to active when receiving data
+        const statusBadge = receiverCard.querySelector('.status-badge');
+        if (statusBadge) {
+            statusBadge.setAttribute('data-status', 'active');
+            statusBadge.textContent = 'Active';
+        }
+
+        // Add flash-update class to trigger animation
+        receiverCard.classList.add('flash-update');
+
+        // Remove the class after animation completes (500ms)
+        setTimeout(() => {
+            receiverCard.classList.remove('flash-update');
+        }, 500);
+    }
+
+    /**
+     * Create a new receiver card for a device
+     */
+    function createReceiverCard(deviceId) {
+        const container = document.getElementById('receivers-container');
+
+        // Create the card HTML
+        const cardHTML = `
+            <div class="receiver-card" data-device-id="${deviceId}">
+                <div class="card-header">
+                    <h3 class="receiver-name">${deviceId}</h3>
+                    <span class="status-badge" data-status="disconnected">Disconnected</span>
+                </div>
+                <div class="card-body">
+                    <div class="device-id">${deviceId}</div>
+                    <div class="rssi-display">
+                        <span class="rssi-value">--</span>
+                        <span class="rssi-label">RSSI</span>
+                    </div>
+                    <div class="packet-loss-indicator">
+                        <svg class="progress-circle">
+                            <circle class="progress-bg" cx="24" cy="24" r="20"></circle>
+                            <circle class="progress-arc" cx="24" cy="24" r="20" data-percentage="0"></circle>
+                        </svg>
+                        <span class="loss-percentage">0%</span>
+                    </div>
+                    <div class="sequence-number">Seq: --</div>
+                </div>
+            </div>
+        `;
+
+        // Create a temporary div to hold the HTML
+        const tempDiv = document.createElement('div');
+        tempDiv.innerHTML = cardHTML;
+        const newCard = tempDiv.firstElementChild;
+
+        // Add the card to the container
+        container.appendChild(newCard);
+
+        return newCard;
+    }
+
+    function handleNewData(msg) {
+        // Update last update timestamp
+        var now = new Date();
+        var timeString = now.toLocaleTimeString('en-US', {
+            hour12: false,
+            hour: '2-digit',
+            minute: '2-digit',
+            second: '2-digit'
+        });
+        document.getElementById('last-update').textContent = timeString;
+
+        // Update the corresponding receiver card with new data and flash animation
+        updateReceiverCard(msg.device_id, msg.data, msg.seq, msg.packet_loss);
+
+        const tableRow = {
+            device_id: msg.device_id,
+            seq: msg.seq,
+            packet_loss: msg.packet_loss,
+            rssi: msg.data.rssi || '--',
+            time_display: timeString
+        };
+
+        if (isDatabaseLoading) {
+            bufferedRows.push(tableRow);
+        } else {
+            appendRowToTable(tableRow, true);
+            enforceLiveRowLimit();
+            applyFilter();
+        }
+    }
+
+    socket.on('new_data', function(msg) {
+        console.log('Received new data:', msg); // Debug log
+        handleNewData(msg);
+    });
+
+    /**
+     * Apply a coalesced batch of updates in a single DOM pass
+     */
+    function handleNewDataBatch(updates) {
+        if (!updates.length) {
+            return;
+        }
+
+        var now = new Date();
+        var timeString = now.toLocaleTimeString('en-US', {
+            hour12: false,
+            hour: '2-digit',
+            minute: '2-digit',
+            second: '2-digit'
+        });
+        document.getElementById('last-update').textContent = timeString;
+
+        // Only the newest update per device matters for the receiver cards
+        const latestByDevice = new Map();
+        updates.forEach(msg => latestByDevice.set(msg.device_id, msg));
+        latestByDevice.forEach(msg => {
+            updateReceiverCard(msg.device_id, msg.data, msg.seq, msg.packet_loss);
+        });
+
+        const tableRows = updates.map(msg => ({
+            device_id: msg.device_id,
+            seq: msg.seq,
+            packet_loss: msg.packet_loss,
+            rssi: msg.data.rssi || '--',
+            time_display: timeString
+        }));
+
+        if (isDatabaseLoading) {
+            bufferedRows.push(...tableRows);
+            return;
+        }
+
+        const tableBody = document.getElementById('data-rows');
+        if (!tableBody) {
+            return;
+        }
+
+        // Rows the live limit would trim straight away are never built
+        const visibleRows = isFullTableLoaded ? tableRows : tableRows.slice(-LIVE_ROW_LIMIT);
+        const fragment = document.createDocumentFragment();
+        const newRows = [];
+        for (let i = visibleRows.length - 1; i >= 0; i--) {
+            const row = createTableRow(visibleRows[i]);
+            newRows.push(row);
+            fragment.appendChild(row);
+        }
+        const filterInput = document.getElementById('device-filter');
+        applyFilterToRows(newRows, filterInput ? filterInput.value.toLowerCase().trim() : '');
+        tableBody.insertBefore(fragment, tableBody.firstChild);
+        enforceLiveRowLimit();
+    }
+
+    // The server coalesces packets into one event per broadcast tick
+    socket.on('new_data_batch', function(msg) {
+        handleNewDataBatch(msg.updates || []);
+    });
+
+});
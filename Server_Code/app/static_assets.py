@@ -0,0 +1,73 @@
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+from negotiation import accepted_encodings, etag_matches
+
+CONTENT_TYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+}
+
+# URLs carry the content hash, so a changed file is a new URL and browsers can keep the old one forever
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class StaticAssets:
+    """
+    The dashboard's CSS/JS, read once at startup and kept in memory together
+    with gzip and (when the brotli package is installed) brotli copies.
+
+    select() picks the response for a request and is framework neutral, so
+    the Flask and ASGI servers answer identically: the smallest encoding the
+    client accepts, an ETag per encoding, and 304 when If-None-Match matches.
+    """
+
+    def __init__(self, directory):
+        self._assets = {}
+        for name in sorted(os.listdir(directory)):
+            content_type = CONTENT_TYPES.get(os.path.splitext(name)[1])
+            if content_type is None:
+                continue
+            with open(os.path.join(directory, name), 'rb') as asset_file:
+                body = asset_file.read()
+            digest = hashlib.sha256(body).hexdigest()[:16]
+            # Preferred first; identity is always there as the fallback
+            variants = []
+            if brotli is not None:
+                variants.append(('br', brotli.compress(body, quality=11)))
+            variants.append(('gzip', gzip.compress(body, compresslevel=9, mtime=0)))
+            variants.append((None, body))
+            self._assets[name] = {
+                'version': digest,
+                'content_type': content_type,
+                'variants': [(encoding, f'"{digest}-{encoding}"' if encoding else f'"{digest}"', data)
+                             for encoding, data in variants]
+            }
+
+    def names(self):
+        return list(self._assets)
+
+    def url(self, name):
+        return f"/static/{name}?v={self._assets[name]['version']}"
+
+    def select(self, name, accept_encoding='', if_none_match=''):
+        """(status, headers, body) for one asset request, or None for an unknown name"""
+        asset = self._assets.get(name)
+        if asset is None:
+            return None
+        accepted = accepted_encodings(accept_encoding)
+        encoding, etag, body = next(variant for variant in asset['variants']
+                                    if variant[0] is None or variant[0] in accepted)
+        headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+        if etag_matches(if_none_match, etag):
+            return 304, headers, b''
+        headers['Content-Type'] = asset['content_type']
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return 200, headers, body
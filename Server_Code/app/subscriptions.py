@@ -0,0 +1,126 @@
+import threading
+from collections import Counter
+from fnmatch import fnmatchcase
+
+# Clients that haven't narrowed their subscription get every device
+ALL_ROOM = 'devices:all'
+
+
+def device_room(device_id):
+    return f'device:{device_id}'
+
+
+class SubscriptionRegistry:
+    """
+    Which dashboard sockets want which devices, kept as Socket.IO rooms.
+
+    A client subscribes to explicit device ids and/or case-insensitive
+    glob patterns (e.g. "rx00*"). Pattern subscribers are joined to the
+    room of every matching device, including devices first seen later, so
+    each update is only sent to the rooms that asked for it.
+
+    With distributed=True (several workers sharing a message queue) the
+    subscribers may sit on another worker, whose rooms this process can't
+    see, so every update goes to its device room and to ALL_ROOM. Patterns
+    are still expanded per worker: a device first seen by another worker
+    reaches a pattern subscriber once it has been stored and the client
+    subscribes again.
+    """
+
+    def __init__(self, server, namespace='/', distributed=False):
+        # A python-socketio Server or AsyncServer; rooms are joined through its
+        # manager directly, which is synchronous for both
+        self.server = server
+        self.namespace = namespace
+        self.distributed = distributed
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._room_members = Counter()
+        self._known_devices = set()
+
+    def connect(self, sid):
+        self.subscribe(sid)
+
+    def disconnect(self, sid):
+        # Socket.IO drops the rooms itself; only the bookkeeping is left
+        with self._lock:
+            client = self._clients.pop(sid, None)
+            if client is not None:
+                self._room_members.subtract(client['rooms'])
+
+    def subscribe(self, sid, devices=(), patterns=()):
+        """Replace a client's subscription; no devices and no patterns means everything"""
+        devices = {str(device_id) for device_id in devices if device_id}
+        patterns = tuple({str(pattern).lower() for pattern in patterns if pattern})
+        with self._lock:
+            previous = self._clients.get(sid)
+            client = {'devices': devices, 'patterns': patterns, 'rooms': set()}
+            client['rooms'] = self._rooms_for(client)
+            old_rooms = previous['rooms'] if previous else set()
+            for room in old_rooms - client['rooms']:
+                self.server.manager.basic_leave_room(sid, self.namespace, room)
+            for room in client['rooms'] - old_rooms:
+                self.server.manager.basic_enter_room(sid, self.namespace, room)
+            self._room_members.subtract(old_rooms)
+            self._room_members.update(client['rooms'])
+            self._clients[sid] = client
+        return {'devices': sorted(devices), 'patterns': list(patterns)}
+
+    def route(self, updates):
+        """Split a list of updates into (room, updates) pairs that may have listeners"""
+        by_device = {}
+        for update in updates:
+            by_device.setdefault(update['device_id'], []).append(update)
+
+        self.observe(by_device)
+        with self._lock:
+            routes = []
+            if self.distributed or self._room_members[ALL_ROOM] > 0:
+                routes.append((ALL_ROOM, updates))
+            for device_id, device_updates in by_device.items():
+                if self.distributed or self._room_members[device_room(device_id)] > 0:
+                    routes.append((device_room(device_id), device_updates))
+        return routes
+
+    def counts(self):
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'all_devices': self._room_members[ALL_ROOM],
+                'devices': {
+                    room.split(':', 1)[1]: members
+                    for room, members in sorted(self._room_members.items())
+                    if room != ALL_ROOM and members > 0
+                }
+            }
+
+    def _matches(self, client, device_id):
+        if device_id in client['devices']:
+            return True
+        lowered = device_id.lower()
+        return any(fnmatchcase(lowered, pattern) for pattern in client['patterns'])
+
+    def _rooms_for(self, client):
+        if not client['devices'] and not client['patterns']:
+            return {ALL_ROOM}
+        rooms = {device_room(device_id) for device_id in client['devices']}
+        rooms.update(device_room(device_id) for device_id in self._known_devices
+                     if self._matches(client, device_id))
+        return rooms
+
+    def observe(self, device_ids):
+        # A device seen for the first time may match existing pattern subscriptions
+        with self._lock:
+            new_devices = set(device_ids) - self._known_devices
+            if not new_devices:
+                return
+            self._known_devices.update(new_devices)
+            for sid, client in self._clients.items():
+                if not client['patterns']:
+                    continue
+                for device_id in new_devices:
+                    room = device_room(device_id)
+                    if room not in client['rooms'] and self._matches(client, device_id):
+                        self.server.manager.basic_enter_room(sid, self.namespace, room)
+                        client['rooms'].add(room)
+                        self._room_members[room] += 1
@@ -3,8 +3,10 @@ import sqlite3
 import app as app_module
 
 TEST_DB = 'data_store/device_data.db'
-if os.path.exists(TEST_DB):
-    os.remove(TEST_DB)
+# The database runs in WAL mode, so drop the journal side files too
+for path in (TEST_DB, TEST_DB + '-wal', TEST_DB + '-shm'):
+    if os.path.exists(path):
+        os.remove(path)
 
 app_module.DATABASE_PATH = TEST_DB
 app_module.init_db()
@@ -24,4 +26,209 @@ payload = {
 with sqlite3.connect(TEST_DB) as conn:
     conn.execute("INSERT INTO data (device_id, seq, packet_loss, data, timestamp) VALUES (?, ?, ?, ?, ?)",
                  (payload['device_id'], payload['seq'], payload['packet_loss'], payload['data'], payload['timestamp']))
-    conn.commit()
\ No newline at end of file
+    conn.commit()
+
+# ---- Multi-process loss accounting stress test ----
+# Several processes hammer one device at once through the shared (loss table)
+# device state. Every packet must be counted exactly once and the loss figures
+# must equal a serial replay of the packets in commit order.
+import multiprocessing
+from device_state import SeqWindow, SharedDeviceState
+
+STRESS_DEVICE = 'RXSTRESS'
+STRESS_WORKERS = 4
+STRESS_PACKETS = 150
+
+app_module.device_states = SharedDeviceState()
+app_module.device_states.load(TEST_DB)
+
+
+def hammer(worker):
+    stress_client = app_module.app.test_client()
+    for i in range(STRESS_PACKETS):
+        # Interleaved seqs with a hole every 7th packet so gaps get counted
+        seq = (i * STRESS_WORKERS + worker) * 7 // 6 + 1
+        resp = stress_client.post(f'/{STRESS_DEVICE}/data',
+                                  json={'message': 'skywalker', 'seq': seq, 'rssi': -60})
+        assert resp.status_code == 201, resp.status_code
+
+
+ctx = multiprocessing.get_context('fork')
+workers = [ctx.Process(target=hammer, args=(n,)) for n in range(STRESS_WORKERS)]
+for proc in workers:
+    proc.start()
+for proc in workers:
+    proc.join()
+    assert proc.exitcode == 0, proc.exitcode
+
+with sqlite3.connect(TEST_DB) as conn:
+    stored = conn.execute("SELECT seq, packet_loss FROM data WHERE device_id=? ORDER BY id",
+                          (STRESS_DEVICE,)).fetchall()
+    lost, last, seen = conn.execute("SELECT diffpacket, last_seq, seen FROM loss WHERE recieverid=?",
+                                    (STRESS_DEVICE,)).fetchone()
+
+assert len(stored) == STRESS_WORKERS * STRESS_PACKETS, len(stored)
+assert seen == STRESS_WORKERS * STRESS_PACKETS, seen
+
+replay = SeqWindow()
+for seq, packet_loss in stored:
+    replay.add(seq)
+    assert packet_loss == replay.packet_loss, (seq, packet_loss)
+assert lost == replay.lost, (lost, replay.lost)
+assert last == replay.highest, (last, replay.highest)
+assert app_module.device_states.get(STRESS_DEVICE) == replay.counters()
+
+
+# ---- Sequence window: reordering, duplicates and transmitter resets ----
+window = SeqWindow(size=16)
+for seq in (1, 2, 5, 3, 3, 6, 4, 9):
+    window.add(seq)
+# 7 and 8 are still missing; 3 and 4 arrived late, one 3 was a duplicate
+assert (window.lost, window.reordered, window.duplicates) == (2, 2, 1), window.counters()
+window.add(1)
+window.add(2)
+assert window.resets == 1 and window.highest == 2, window.counters()
+window.add(40)
+window.add(3)
+assert window.resets == 2 and window.lost == 2 + 37, window.counters()
+assert window.received == 11 and window.seen == 12, window.counters()
+
+# A reboot whose seq 1 was lost is still a reset, and a retried seq is a duplicate, not a reset;
+# recompute_loss and analytics must agree
+import numpy as np
+import analytics
+import recompute_loss
+
+for seqs, counts in ((list(range(1, 101)) + list(range(2, 60)), (1, 158, 0)),
+                     (list(range(1, 101)) + [1, 1], (1, 101, 1)),
+                     (list(range(1, 101)) + [100, 100], (0, 100, 2))):
+    window = SeqWindow()
+    for seq in seqs:
+        window.add(seq)
+    assert (window.resets, window.received, window.duplicates) == counts, window.counters()
+    replay = recompute_loss.DeviceReplay(window.size)
+    replay.replay(np.array(seqs, dtype=np.int64))
+    assert replay.state().to_row() == window.to_row()
+    summary = analytics.delivery(np.array(seqs, dtype=np.int64), window.size)
+    assert (summary['resets'], summary['received'], summary['duplicates']) == counts, summary
+
+
+# ---- Schema migrations and index usage ----
+import migrations
+import partitions
+
+with sqlite3.connect(TEST_DB) as conn:
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == migrations.SCHEMA_VERSION
+    # A second run finds nothing to do
+    assert migrations.migrate(conn) == []
+    # Close the migrated table so there is also a partition created by a rollover
+    partitions.rollover(conn, '29991231')
+    conn.commit()
+    partition_days = conn.execute("SELECT name, day FROM data_partitions ORDER BY number").fetchall()
+    index_names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+assert [name for name, _ in partition_days] == ['data_' + partition_days[0][1], partitions.CURRENT], partition_days
+
+
+def query_plan(sql, params=()):
+    with sqlite3.connect(TEST_DB) as conn:
+        return ' '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+
+
+for table, day in partition_days:
+    # Rolled-over partitions name their indexes after their day; the migrated table keeps the original names
+    def index(suffix):
+        name = f'idx_data_{day}_{suffix}' if table == partitions.CURRENT else f'idx_data_{suffix}'
+        assert name in index_names, (table, name)
+        return name
+
+    plan = query_plan(f"SELECT seq, rssi FROM {table} WHERE device_id=? ORDER BY id DESC LIMIT 20", ('RX001',))
+    assert index('device_id') in plan and 'TEMP B-TREE' not in plan, plan
+    plan = query_plan(f"SELECT device_id, COUNT(*) FROM {table} GROUP BY device_id")
+    assert 'COVERING INDEX' in plan, plan
+    plan = query_plan(f"SELECT id FROM {table} WHERE timestamp >= ? AND timestamp < ?", ('2024-01-01', '2024-01-02'))
+    assert index('timestamp') in plan, plan
+    plan = query_plan(f"SELECT id FROM {table} WHERE device_id=? AND seq BETWEEN ? AND ?", ('RX001', 1, 10))
+    assert index('device_seq') in plan, plan
+    plan = query_plan(f"SELECT id FROM {table} WHERE device_id=? AND timestamp >= ? ORDER BY timestamp, id",
+                      ('RX001', '2024-01-01'))
+    assert index('device_timestamp') in plan, plan
+
+
+# ---- recompute_loss replays packets exactly like SeqWindow ----
+import random
+
+rng = random.Random(2024)
+for _ in range(100):
+    size = rng.choice([8, 16, 256])
+    # In-order runs with gaps, duplicates, late packets, restarts at 0/1 and long jumps
+    seqs = []
+    seq = rng.randint(0, 5)
+    for _ in range(rng.randint(1, 400)):
+        roll = rng.random()
+        if roll < 0.6:
+            seq += 1
+        elif roll < 0.75:
+            seq += rng.randint(2, 20)
+        elif roll < 0.85:
+            pass
+        elif roll < 0.95:
+            seq = max(0, seq - rng.randint(1, size + 5))
+        elif roll < 0.98:
+            seq = rng.choice([0, 1])
+        else:
+            seq += rng.randint(100, 1000)
+        seqs.append(seq)
+    device_ids = [rng.choice('abc') for _ in seqs]
+
+    windows = {}
+    expected = []
+    for device_id, seq in zip(device_ids, seqs):
+        window = windows.setdefault(device_id, SeqWindow(size))
+        window.add(seq)
+        expected.append(window.packet_loss)
+
+    # Arbitrary chunk and scan sizes must not change the result
+    replay = recompute_loss.LossReplay(size)
+    chunk = rng.choice([1, 7, 100, 5000])
+    scan_rows, recompute_loss.SCAN_ROWS = recompute_loss.SCAN_ROWS, rng.choice([3, 50, 65536])
+    got = []
+    for start in range(0, len(seqs), chunk):
+        got += replay.packet_loss(device_ids[start:start + chunk],
+                                  np.array(seqs[start:start + chunk], dtype=np.int64)).tolist()
+    recompute_loss.SCAN_ROWS = scan_rows
+    assert got == expected, (size, seqs)
+    for device_id, window in windows.items():
+        assert replay.devices[device_id].state().to_row() == window.to_row(), (size, device_id, seqs)
+
+# ---- Receptions share the transmitter's epoch across receivers that joined at different times ----
+client.post('/data/clear')
+
+
+def upload(device_id, seqs):
+    packets = [{'message': 'skywalker', 'seq': seq, 'rssi': rssi} for seq, rssi in seqs]
+    resp = client.post(f'/{device_id}/data/batch', json=packets)
+    assert resp.status_code == 201, resp.get_data(as_text=True)
+
+
+# RX001 hears the whole first run; RX003 comes online part way through it.
+# After a power cycle RX001, RX003 and the newly started RX002 all hear 1..50.
+upload('RX001', [(seq, -60) for seq in range(1, 101)])
+upload('RX003', [(seq, -70) for seq in range(60, 101)])
+upload('RX001', [(seq, -60) for seq in range(1, 51)])
+upload('RX002', [(seq, -50) for seq in range(1, 51)])
+upload('RX003', [(seq, -70) for seq in range(1, 51)])
+
+packet = client.get('/packets/10').get_json()
+assert packet['epoch'] == 1 and packet['best_receiver'] == 'RX002', packet
+assert sorted(receiver['device_id'] for receiver in packet['receivers']) == ['RX001', 'RX002', 'RX003'], packet
+packet = client.get('/packets/80').get_json()
+assert packet['epoch'] == 0, packet
+assert sorted(receiver['device_id'] for receiver in packet['receivers']) == ['RX001', 'RX003'], packet
+stats = client.get('/packets/stats').get_json()
+assert (stats['epochs'], stats['packets_sent'], stats['packets_heard']) == (2, 150, 150), stats
+
+# ---- Rollup loss leaves duplicates out, like the live figure ----
+upload('RXDUP', [(seq, -60) for seq in (1, 2, 2, 4)])
+columns = client.get('/rollups?resolution=1m&device_id=RXDUP').get_json()['columns']
+assert (columns['packets'], columns['received'], columns['lost']) == ([4], [3], [1]), columns
+assert columns['packet_loss'] == [app_module.device_states.get('RXDUP')['packet_loss']] == [25.0], columns
@@ -60,7 +60,13 @@ Type=simple
 User={SERVER_USER}
 WorkingDirectory={REMOTE_APP_DIR}
 Environment="PATH={REMOTE_APP_DIR}/venv/bin"
-ExecStart={REMOTE_APP_DIR}/venv/bin/python app.py
+Environment="IOT_SERVER_PROFILE=production"
+Environment="WEB_CONCURRENCY=1"
+ExecStart={REMOTE_APP_DIR}/venv/bin/gunicorn -c gunicorn.conf.py app:app
+ExecReload=/bin/kill -HUP $MAINPID
+# gunicorn drains for IOT_GRACEFUL_TIMEOUT (30s) before systemd gives up
+KillSignal=SIGTERM
+TimeoutStopSec=40
 Restart=always
 RestartSec=3
 